@@ -0,0 +1 @@
+"""Benchmarks of cfg4py, run `python -m benchmarks` from the repo root."""
@@ -0,0 +1,157 @@
+"""Run the benchmark suites, save results as json, and compare with a baseline.
+
+Usage:
+    python -m benchmarks [--filter REGEX] [--repeat N] [--output FILE]
+                         [--compare BASELINE] [--threshold RATIO]
+
+Run it from the repo root. Results of different versions are comparable as long as
+they're run on the same machine, e.g. check out a release, save its results with
+`--output`, then check out the branch and run with `--compare`. Exits with 1 if any
+benchmark is slower than the baseline by more than `threshold`.
+"""
+import argparse
+import inspect
+import itertools
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+
+import cfg4py
+from benchmarks import suites
+
+HOME = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=HOME,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _suites():
+    for name, cls in inspect.getmembers(suites, inspect.isclass):
+        if cls.__module__ == suites.__name__ and not name.startswith("_"):
+            yield name, cls
+
+
+def _time(func, repeat: int) -> float:
+    """returns the best seconds per call, which is the least disturbed by noise"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run(pattern: str = "", repeat: int = 5) -> dict:
+    """returns {benchmark name: seconds per call}"""
+    results = {}
+    for suite_name, cls in _suites():
+        methods = sorted(m for m in dir(cls) if m.startswith("time_"))
+        for params in itertools.product(*getattr(cls, "params", [[]])):
+            label = ", ".join(repr(p) for p in params)
+            names = {m: f"{suite_name}.{m}({label})" for m in methods}
+            if pattern and not any(re.search(pattern, n) for n in names.values()):
+                continue
+
+            for method, name in names.items():
+                if pattern and not re.search(pattern, name):
+                    continue
+
+                suite = cls()
+                try:
+                    if hasattr(suite, "setup"):
+                        suite.setup(*params)
+                except NotImplementedError:
+                    print(f"{name:64} skipped")
+                    continue
+
+                try:
+                    bound = getattr(suite, method)
+                    results[name] = _time(lambda: bound(*params), repeat)
+                finally:
+                    if hasattr(suite, "teardown"):
+                        suite.teardown(*params)
+
+                print(f"{name:64} {_format(results[name])}")
+
+    return results
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """print ratios against `baseline`, returns False if any regression found"""
+    ok = True
+    print(f"\ncompared with {baseline['meta']['revision']}:")
+    for name, seconds in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+
+        ratio = seconds / base
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        elif ratio < 1 / threshold:
+            flag = "  improved"
+
+        print(f"{name:64} {ratio:6.2f}x{flag}")
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--filter", default="", help="regex of benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="save results to this json file")
+    parser.add_argument("--compare", help="json file saved by a previous run")
+    parser.add_argument("--threshold", type=float, default=1.3)
+    args = parser.parse_args()
+
+    # keep logs of cfg4py out of the timing
+    logging.disable(logging.CRITICAL)
+
+    results = run(args.filter, args.repeat)
+    report = {
+        "meta": {
+            "cfg4py": cfg4py.__version__,
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.node(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        if not compare(results, baseline, args.threshold):
+            sys.exit(f"\nslower than {args.compare} by more than {args.threshold}x")
+
+
+if __name__ == "__main__":
+    main()
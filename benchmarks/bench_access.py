@@ -0,0 +1,50 @@
+"""Measure the cost of reading `cfg.services.redis.host`.
+
+Usage:
+    python benchmarks/bench_access.py [--number N]
+
+The default mode counts every attribute read, while `init(fast=True)` drops the
+counter. `cfg4py.getter` reads the path from a flattened index. All are timed
+against the same configuration.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cfg4py  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "../cfg4py/resources")
+
+
+def bench(fast: bool, number: int, stmt: str = "cfg.services.redis.host") -> float:
+    """returns nanoseconds per read of the path"""
+    cfg = cfg4py.init(RESOURCES, dump_on_change=False, fast=fast)
+    host = cfg4py.getter("services.redis.host")
+
+    best = min(
+        timeit.repeat(
+            stmt, globals={"cfg": cfg, "host": host}, number=number, repeat=5
+        )
+    )
+
+    return best / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+
+    counted = bench(False, args.number)
+    fast = bench(True, args.number)
+    getter = bench(False, args.number, "host()")
+    print(f"counted mode: {counted:8.1f} ns/read")
+    print(f"fast mode   : {fast:8.1f} ns/read ({counted / fast:.1f}x)")
+    print(f"getter      : {getter:8.1f} ns/read ({counted / getter:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
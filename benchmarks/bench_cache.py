@@ -0,0 +1,93 @@
+"""Compare cold and warm `init()` with the compiled config cache.
+
+Usage:
+    python benchmarks/bench_cache.py [--sections N] [--runs N]
+
+A config with `sections` sections (about 12 lines each) is generated in a temporary
+directory. Cold runs parse the yaml files, warm runs load the cache.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cfg4py  # noqa: E402
+from cfg4py import core  # noqa: E402
+from cfg4py.envsubst import compile_template  # noqa: E402
+
+
+def generate(config_dir: str, sections: int):
+    lines = []
+    for i in range(sections):
+        lines.extend(
+            [
+                f"section_{i}:",
+                "  redis:",
+                f"    host: redis-{i}.local",
+                f"    port: {6379 + i}",
+                "    password: ${CFG4PY_BENCH_PASSWORD}",
+                "  postgres:",
+                f"    dsn: postgres://user@pg-{i}.local/db",
+                "    pool:",
+                "      min: 1",
+                "      max: 10",
+                "  tags: [a, b, c]",
+                f"  enabled: {'true' if i % 2 else 'false'}",
+            ]
+        )
+
+    with open(os.path.join(config_dir, "defaults.yaml"), "w") as f:
+        f.write("\n".join(lines))
+
+    with open(os.path.join(config_dir, "production.yaml"), "w") as f:
+        f.write("section_0:\n  redis:\n    host: redis.prod\n")
+
+
+def timed_init(config_dir: str, cache_dir: str = None) -> float:
+    # templates compiled by the previous run would make a cold run warm
+    compile_template.cache_clear()
+    start = time.perf_counter()
+    cfg4py.init(config_dir, dump_on_change=False, fast=True, cache_dir=cache_dir)
+    elapsed = time.perf_counter() - start
+
+    core._local_observer.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ[cfg4py.envar] = "PRODUCTION"
+    os.environ["CFG4PY_BENCH_PASSWORD"] = "secret"
+
+    root = tempfile.mkdtemp()
+    config_dir = os.path.join(root, "config")
+    cache_dir = os.path.join(root, "cache")
+    os.makedirs(config_dir)
+    try:
+        generate(config_dir, args.sections)
+        lines = args.sections * 12
+
+        cold = min(timed_init(config_dir) for _ in range(args.runs))
+
+        # first run compiles and saves the cache
+        timed_init(config_dir, cache_dir)
+        warm = min(timed_init(config_dir, cache_dir) for _ in range(args.runs))
+
+        print(f"config size: {lines} lines")
+        print(f"cold init  : {cold * 1000:8.1f} ms")
+        print(f"warm init  : {warm * 1000:8.1f} ms")
+        print(f"speedup    : {cold / warm:8.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
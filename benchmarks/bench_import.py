@@ -0,0 +1,82 @@
+"""Measure the time spent by `import cfg4py`, with `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_import.py [--budget-ms MS] [--runs N] [--top N]
+
+Exits with 1 if the median cumulative import time of cfg4py exceeds the budget, or
+any of the heavy dependencies is imported along with cfg4py.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HOME = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+
+# these must be imported only when the feature needs them is used
+HEAVY = (
+    "apscheduler",
+    "watchdog",
+    "ruamel",
+    "yaml",
+    "msgpack",
+    "asyncio",
+    "redis",
+    "fire",
+)
+
+
+def run_once():
+    """returns {module: cumulative us} of one `import cfg4py`"""
+    env = dict(os.environ, PYTHONPATH=HOME)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import cfg4py"],
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        _, cumulative, module = line[len("import time:") :].split("|")
+        timings[module.strip()] = int(cumulative)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=80)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    median = statistics.median(r["cfg4py"] for r in runs) / 1000
+
+    last = runs[-1]
+    print(f"import cfg4py: {median:.1f} ms (median of {args.runs} runs)")
+    print("slowest modules of last run:")
+    for module, us in sorted(last.items(), key=lambda x: -x[1])[1 : args.top + 1]:
+        print(f"    {us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    heavy = sorted(m for m in last if m.split(".")[0] in HEAVY)
+    if heavy:
+        print(f"FAIL: heavy modules imported: {', '.join(heavy)}")
+        failed = True
+
+    if median > args.budget_ms:
+        print(f"FAIL: over budget ({args.budget_ms} ms)")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
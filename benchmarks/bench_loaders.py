@@ -0,0 +1,128 @@
+"""Compare parse time of loader backends on a large generated config.
+
+Usage:
+    python benchmarks/bench_loaders.py [--sections N] [--runs N]
+
+The same configuration, `sections` sections of about 12 values each, is serialized
+as yaml, json, toml and msgpack, then parsed by every available backend. Backends
+which are not installed are skipped.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from io import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cfg4py import loaders  # noqa: E402
+
+
+def generate(sections: int) -> dict:
+    conf = {}
+    for i in range(sections):
+        conf[f"section_{i}"] = {
+            "redis": {"host": f"redis-{i}.local", "port": 6379 + i, "db": i % 16},
+            "postgres": {
+                "dsn": f"postgres://user@pg-{i}.local/db",
+                "pool": {"min": 1, "max": 10, "timeout": 2.5},
+            },
+            "tags": ["a", "b", "c"],
+            "enabled": i % 2 == 0,
+        }
+
+    return conf
+
+
+def to_yaml(conf: dict) -> str:
+    from ruamel.yaml import YAML
+
+    stream = StringIO()
+    yaml = YAML(typ="safe", pure=True)
+    yaml.default_flow_style = False
+    yaml.dump(conf, stream)
+    return stream.getvalue()
+
+
+def _toml_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(_toml_value(v) for v in value) + "]"
+    return repr(value)
+
+
+def to_toml(conf: dict, prefix: str = "") -> str:
+    lines = []
+    tables = []
+    for key, value in conf.items():
+        if isinstance(value, dict):
+            tables.append((key, value))
+        else:
+            lines.append(f"{key} = {_toml_value(value)}")
+
+    for key, value in tables:
+        name = f"{prefix}{key}"
+        lines.append(f"\n[{name}]")
+        lines.append(to_toml(value, name + "."))
+
+    return "\n".join(lines)
+
+
+def backends(conf: dict):
+    """yields (name, load, content) of available backends"""
+    yaml_content = to_yaml(conf)
+    for name in ("ruamel", "ruamel-c", "pyyaml-c"):
+        try:
+            loaders.set_yaml_backend(name)
+        except (ImportError, AttributeError):
+            print(f"{'yaml/' + name:16} not installed, skipped")
+            continue
+
+        yield f"yaml/{name}", loaders._yaml_load, yaml_content
+
+    yield "json", loaders.get("json").load, json.dumps(conf)
+    yield "toml", loaders.get("toml").load, to_toml(conf)
+
+    try:
+        import msgpack
+
+        yield "msgpack", loaders.get("msgpack").load, msgpack.packb(conf)
+    except ImportError:
+        print(f"{'msgpack':16} not installed, skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    conf = generate(args.sections)
+    print(f"config: {args.sections} sections, {args.sections * 12} values")
+
+    results = []
+    for name, load, content in backends(conf):
+        assert load(content) == conf, f"{name} parsed a different configuration"
+
+        elapsed = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            load(content)
+            elapsed.append(time.perf_counter() - start)
+
+        results.append((name, min(elapsed), len(content)))
+
+    slowest = max(r[1] for r in results)
+    for name, elapsed, size in results:
+        print(
+            f"{name:16} {elapsed * 1000:9.1f} ms  {size / 1024:8.1f} KiB"
+            f"  {slowest / elapsed:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
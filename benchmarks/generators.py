@@ -0,0 +1,109 @@
+"""Synthetic configurations and a fake remote fetcher for benchmarks."""
+import os
+import random
+from io import StringIO
+from typing import Dict, Tuple
+
+from cfg4py import core
+
+ENVAR_PREFIX = "CFG4PY_BENCH_"
+
+
+def make_config(
+    depth: int = 3,
+    width: int = 8,
+    list_size: int = 4,
+    placeholders: float = 0.1,
+    seed: int = 0,
+) -> Tuple[dict, Dict[str, str]]:
+    """generate a nested configuration
+
+    Args:
+        depth: levels of nested sections
+        width: keys per section
+        list_size: items of list values
+        placeholders: ratio of string leaves which are `${VAR}` placeholders
+        seed: seed of randomness, the same arguments always give the same result
+
+    Returns:
+        the configuration, and the environment variables its placeholders need
+    """
+    rand = random.Random(seed)
+    envars = {}
+
+    def leaf(path: str):
+        kind = rand.randrange(5)
+        if kind == 0:
+            return rand.randrange(100000)
+        if kind == 1:
+            return rand.random() * 100
+        if kind == 2:
+            return rand.random() < 0.5
+        if kind == 3:
+            return [f"{path}-{i}" for i in range(list_size)]
+
+        if rand.random() < placeholders:
+            name = f"{ENVAR_PREFIX}{len(envars)}"
+            envars[name] = f"value-of-{path}"
+            return f"${{{name}}}"
+
+        return f"{path}-value"
+
+    def section(level: int, path: str) -> dict:
+        node = {}
+        for i in range(width):
+            key = f"k{i}"
+            child = f"{path}.{key}" if path else key
+            # about half of the keys are sections, until the last level
+            if level < depth and i % 2 == 0:
+                node[key] = section(level + 1, child)
+            else:
+                node[key] = leaf(child)
+
+        return node
+
+    return section(1, ""), envars
+
+
+def count_leaves(conf: dict) -> int:
+    return sum(count_leaves(v) if isinstance(v, dict) else 1 for v in conf.values())
+
+
+def to_yaml(conf: dict) -> str:
+    from ruamel.yaml import YAML
+
+    stream = StringIO()
+    yaml = YAML(typ="safe", pure=True)
+    yaml.default_flow_style = False
+    yaml.dump(conf, stream)
+    return stream.getvalue()
+
+
+def write_config_dir(config_dir: str, conf: dict, role_conf: dict = None):
+    """write `conf` as defaults.yaml, and `role_conf` as test.yaml"""
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, "defaults.yaml"), "w") as f:
+        f.write(to_yaml(conf))
+
+    with open(os.path.join(config_dir, "test.yaml"), "w") as f:
+        f.write(to_yaml(role_conf or {}))
+
+
+class FakeFetcher(core.RemoteConfigFetcher):
+    """Serves yaml content from memory, like a remote server without the network"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self._version = 1
+        self.fetched = 0
+
+    def publish(self, content: str):
+        self.content = content
+        self._version += 1
+
+    def version(self):
+        return str(self._version)
+
+    def fetch(self) -> dict:
+        self.fetched += 1
+        return core._load_and_replace_envar(self.content)
@@ -0,0 +1,158 @@
+"""Simulate the load a fleet of processes puts on the config store.
+
+Usage:
+    python benchmarks/simulate_fleet.py [--clients N] [--interval SECONDS]
+                                        [--duration SECONDS] [--changes N]
+
+All clients are started by the same deploy at time 0, and the configuration is
+changed `changes` times at random moments. A poll costs one request to read the
+version, plus one to fetch if the version is changed. Subscribed clients refresh
+on notification too. Time is simulated, so it runs in seconds, using the
+scheduling policies of `cfg4py.schedule`.
+
+For each policy, it prints the total requests, the peak and p99 of requests per
+second, and how long clients lag behind a change (staleness).
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cfg4py.schedule import RefreshSchedule  # noqa: E402
+
+
+class FixedSchedule(RefreshSchedule):
+    """An interval job of the scheduler, which is what cfg4py used to do"""
+
+    def __init__(self, interval: float, rand: random.Random = None):
+        super().__init__(interval, jitter=0, rand=rand)
+
+    def first_delay(self) -> float:
+        return self.interval
+
+
+def simulate(
+    make_schedule,
+    clients: int,
+    duration: float,
+    changes: list,
+    subscribe: bool = False,
+) -> dict:
+    """returns load and staleness of the fleet
+
+    Args:
+        make_schedule: creates a `RefreshSchedule` for a client, by its random
+         source
+        clients: number of clients
+        duration: seconds simulated
+        changes: moments the configuration is changed, sorted
+        subscribe: if clients are notified of changes
+    """
+    # (time, kind, client, generation), kind 0 is a change, 1 is a refresh
+    events = [(t, 0, -1, 0) for t in changes]
+    schedules = []
+    for i in range(clients):
+        schedule = make_schedule(random.Random(i))
+        schedules.append(schedule)
+        events.append((schedule.first_delay(), 1, i, 0))
+    heapq.heapify(events)
+
+    # a refresh cancels the poll scheduled before it
+    generations = [0] * clients
+    seen = [0] * clients
+    version = 0
+    changed_at = [0.0]
+    load = Counter()
+    lags = []
+
+    while events:
+        now, kind, client, gen = heapq.heappop(events)
+        if now > duration:
+            break
+
+        if kind == 0:
+            version += 1
+            changed_at.append(now)
+            if subscribe:
+                for i, schedule in enumerate(schedules):
+                    generations[i] += 1
+                    delay = schedule.notify_delay()
+                    heapq.heappush(events, (now + delay, 1, i, generations[i]))
+            continue
+
+        if gen != generations[client]:
+            continue
+
+        load[int(now)] += 1
+        changed = seen[client] != version
+        if changed:
+            load[int(now)] += 1
+            lags.append(now - changed_at[version])
+            seen[client] = version
+
+        generations[client] += 1
+        delay = schedules[client].next_delay(changed)
+        heapq.heappush(events, (now + delay, 1, client, generations[client]))
+
+    per_second = sorted(load.get(s, 0) for s in range(int(duration)))
+    return {
+        "requests": sum(per_second),
+        "peak": per_second[-1],
+        "p99": per_second[int(len(per_second) * 0.99)],
+        "mean_lag": sum(lags) / len(lags) if lags else 0,
+        "max_lag": max(lags, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=60)
+    parser.add_argument("--duration", type=float, default=3600)
+    parser.add_argument("--changes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rand = random.Random(args.seed)
+    changes = sorted(rand.uniform(0, args.duration) for _ in range(args.changes))
+    interval = args.interval
+
+    policies = {
+        "fixed interval": (lambda r: FixedSchedule(interval, r), False),
+        "jitter": (lambda r: RefreshSchedule(interval, 0.1, rand=r), False),
+        "jitter + adaptive": (
+            lambda r: RefreshSchedule(interval, 0.1, interval * 8, rand=r),
+            False,
+        ),
+        "notify": (
+            lambda r: RefreshSchedule(interval * 10, 0.1, rand=r),
+            True,
+        ),
+        "notify + jitter": (
+            lambda r: RefreshSchedule(interval * 10, 0.1, notify_jitter=5, rand=r),
+            True,
+        ),
+    }
+
+    print(
+        f"{args.clients} clients, interval {interval}s, {args.changes} changes "
+        f"in {args.duration}s"
+    )
+    print(
+        f"{'policy':20} {'requests':>9} {'peak/s':>7} {'p99/s':>6} "
+        f"{'mean lag':>9} {'max lag':>8}"
+    )
+    for name, (make_schedule, subscribe) in policies.items():
+        r = simulate(make_schedule, args.clients, args.duration, changes, subscribe)
+        print(
+            f"{name:20} {r['requests']:9d} {r['peak']:7d} {r['p99']:6d} "
+            f"{r['mean_lag']:8.1f}s {r['max_lag']:7.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Benchmarks of cfg4py hot paths, in asv style.
+
+A suite is a class. `setup(*params)` is called for each combination of `params`,
+then every `time_*` method is timed. A setup raises NotImplementedError to skip,
+e.g. if the feature doesn't exist in the version under test.
+"""
+import inspect
+import os
+import shutil
+import tempfile
+
+import cfg4py
+from benchmarks.generators import FakeFetcher, make_config, to_yaml, write_config_dir
+from cfg4py import core
+from cfg4py.config import Config
+
+# size -> (depth, width, list_size)
+SIZES = {"small": (3, 6, 3), "medium": (4, 10, 5), "large": (5, 12, 8)}
+
+
+def _config(size: str, placeholders: float = 0.1, seed: int = 0):
+    depth, width, list_size = SIZES[size]
+    return make_config(depth, width, list_size, placeholders, seed)
+
+
+def _clear_caches():
+    """forget parsed content, so config files are parsed again"""
+    try:
+        from cfg4py.envsubst import compile_template
+    except ImportError:  # older versions
+        return
+
+    compile_template.cache_clear()
+
+
+def _reset():
+    """forget configuration applied by other benchmarks"""
+    cfg4py.init(dump_on_change=False)
+    core._cfg_local, core._cfg_remote = {}, {}
+    core._cfg_remote_hash = core._cfg_remote_version = None
+    core._remote_fetcher = None
+    core._cfg_current, core._cfg_hash = {}, None
+    vars(core._cfg_obj).clear()
+    index = getattr(core, "_index", None)
+    if hasattr(index, "defer"):
+        # as it is on import, built on first read
+        index.defer({})
+    elif index is not None:
+        index.rebuild({})
+
+
+def _require(*options: str):
+    """skips the benchmark if `init` of the version under test lacks `options`"""
+    if not set(options) <= set(inspect.signature(cfg4py.init).parameters):
+        raise NotImplementedError
+
+
+def _override(conf: dict) -> dict:
+    """a role file which overrides about a quarter of the top level sections"""
+    keys = list(conf.keys())
+    return {k: conf[k] for k in keys[: max(1, len(keys) // 4)]}
+
+
+class _TempDir:
+    def make_dir(self):
+        self.root = tempfile.mkdtemp()
+        return self.root
+
+    def teardown(self, *params):
+        if core._local_observer is not None:
+            core._local_observer.stop()
+            core._local_observer = None
+
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class InitSuite(_TempDir):
+    params = [["small", "medium", "large"]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        _reset()
+        conf, envars = _config(size)
+        os.environ.update(envars)
+        os.environ[cfg4py.envar] = "TEST"
+
+        self.config_dir = os.path.join(self.make_dir(), "config")
+        write_config_dir(self.config_dir, conf, _override(conf))
+        cfg4py.init(self.config_dir, dump_on_change=False)
+
+    def time_init(self, size):
+        _clear_caches()
+        cfg4py.init(self.config_dir, dump_on_change=False)
+        core._local_observer.stop()
+        core._local_observer = None
+
+    def time_load_local(self, size):
+        _clear_caches()
+        core._load_from_local_file()
+
+
+class EnvSubstSuite:
+    params = [["medium"], [0.0, 0.1, 0.5]]
+    param_names = ["size", "placeholders"]
+
+    def setup(self, size, placeholders):
+        conf, envars = _config(size, placeholders)
+        os.environ.update(envars)
+        self.content = to_yaml(conf)
+        core._load_and_replace_envar(self.content)
+
+    def time_parse_and_substitute(self, size, placeholders):
+        # a different content each time, so it's not cached
+        self.content += "\n"
+        core._load_and_replace_envar(self.content)
+
+    def time_substitute_cached(self, size, placeholders):
+        core._load_and_replace_envar(self.content)
+
+
+class MergeSuite:
+    params = [["small", "medium", "large"]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        if not hasattr(core, "_merge_remote_local"):
+            raise NotImplementedError
+
+        self.remote, _ = _config(size, placeholders=0)
+        self.local = _override(_config(size, placeholders=0, seed=1)[0])
+
+    def teardown(self, size):
+        _reset()
+
+    def time_merge_remote_local(self, size):
+        core._cfg_remote, core._cfg_local = self.remote, self.local
+        core._merge_remote_local()
+
+
+class MergeStrategySuite:
+    params = [["small", "medium", "large"], ["replace", "append", "key:name"]]
+    param_names = ["size", "lists"]
+
+    def setup(self, size, lists):
+        try:
+            from cfg4py.merge import merge
+        except ImportError:  # older versions
+            raise NotImplementedError
+
+        self.merge = merge
+        self.remote, _ = _config(size, placeholders=0)
+        self.local = _override(_config(size, placeholders=0, seed=1)[0])
+        # a single leaf is overridden
+        key = next(iter(self.remote))
+        self.leaf = {key: {"changed": True}}
+
+    def time_merge(self, size, lists):
+        self.merge(self.remote, self.local, lists)
+
+    def time_merge_one_leaf(self, size, lists):
+        self.merge(self.remote, self.leaf, lists)
+
+
+class ToObjSuite:
+    params = [["small", "medium", "large"]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        self.conf, _ = _config(size, placeholders=0)
+
+    def time_to_obj(self, size):
+        core._to_obj(Config(), self.conf)
+
+
+class UpdateConfigSuite:
+    params = [["small", "large"], [False, True]]
+    param_names = ["size", "snapshot"]
+
+    def setup(self, size, snapshot):
+        if snapshot:
+            _require("snapshot")
+
+        _reset()
+        self.confs = [_config(size, 0, seed)[0] for seed in (0, 1)]
+        self.i = 0
+        cfg4py.init(dump_on_change=False, **({"snapshot": True} if snapshot else {}))
+        cfg4py.update_config(self.confs[0])
+
+    def teardown(self, size, snapshot):
+        _reset()
+
+    def time_update_changed(self, size, snapshot):
+        self.i ^= 1
+        cfg4py.update_config(self.confs[self.i])
+
+    def time_update_unchanged(self, size, snapshot):
+        cfg4py.update_config(self.confs[self.i])
+
+
+class LazySuite:
+    """apply a big configuration of which only one leaf is read"""
+
+    params = [["small", "large"], [False, True], [False, True]]
+    param_names = ["size", "lazy", "snapshot"]
+
+    def setup(self, size, lazy, snapshot):
+        _require("lazy", "snapshot")
+
+        _reset()
+        self.confs = [_config(size, 0, seed)[0] for seed in (0, 1)]
+        self.key = next(k for k, v in self.confs[0].items() if isinstance(v, dict))
+        self.i = 0
+        self.cfg = cfg4py.init(dump_on_change=False, snapshot=snapshot, lazy=lazy)
+        cfg4py.update_config(self.confs[0])
+
+    def teardown(self, size, lazy, snapshot):
+        _reset()
+
+    def time_update_and_read_one(self, size, lazy, snapshot):
+        self.i ^= 1
+        cfg4py.update_config(self.confs[self.i])
+        getattr(self.cfg, self.key)
+
+
+class RefreshSuite:
+    params = [["small", "large"]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        _reset()
+        self.contents = [to_yaml(_config(size, 0, seed)[0]) for seed in (0, 1)]
+        self.i = 0
+        self.fetcher = FakeFetcher(self.contents[0])
+        core._remote_fetcher = self.fetcher
+        core._refresh()
+
+    def teardown(self, size):
+        _reset()
+
+    def time_refresh_changed(self, size):
+        _clear_caches()
+        self.i ^= 1
+        self.fetcher.publish(self.contents[self.i])
+        core._refresh()
+
+    def time_refresh_same_version(self, size):
+        core._refresh()
+
+
+class AccessSuite:
+    params = [["counted", "fast", "snapshot", "getter"]]
+    param_names = ["mode"]
+
+    def setup(self, mode):
+        if mode in ("fast", "snapshot"):
+            _require(mode)
+        elif mode == "getter" and not hasattr(cfg4py, "getter"):
+            raise NotImplementedError
+
+        _reset()
+        conf = {"services": {"redis": {"host": "localhost"}}}
+        options = {mode: True} if mode in ("fast", "snapshot") else {}
+        cfg = cfg4py.init(dump_on_change=False, **options)
+        cfg4py.update_config(conf)
+
+        if mode == "getter":
+            self.read = cfg4py.getter("services.redis.host")
+        else:
+            self.read = lambda: cfg.services.redis.host
+
+    def teardown(self, mode):
+        _reset()
+
+    def time_read_1000(self, mode):
+        read = self.read
+        for _ in range(1000):
+            read()
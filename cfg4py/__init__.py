@@ -1,24 +1,47 @@
 """Top-level package for Cfg4Py."""
+from cfg4py.backoff import FetchError
 from cfg4py.core import (
     RedisConfigFetcher,
+    RedisHashConfigFetcher,
     RemoteConfigFetcher,
-    _cfg_obj,
+    add_change_listener,
     config_remote_fetcher,
     config_server_role,
     enable_logging,
     envar,
     get_config_dir,
+    get_index,
+    get_instance,
+    get_snapshot,
+    getter,
     init,
+    remove_change_listener,
     update_config,
 )
+from cfg4py.envsubst import EnvarNotSetError
+from cfg4py.fetchers import FileConfigFetcher, HTTPConfigFetcher
 
 __author__ = """Aaron Yang"""
 __email__ = "code@jieyu.ai"
 __version__ = "0.9.3"
 
+# exported from cfg4py.aio, which is imported on first access since asyncio is slow
+# to import
+_aio_exports = (
+    "AsyncRemoteConfigFetcher",
+    "AsyncRedisConfigFetcher",
+    "init_async",
+    "next_change",
+)
+
+
+def __getattr__(name):
+    if name in _aio_exports:
+        from cfg4py import aio
+
+        return getattr(aio, name)
 
-def get_instance():
-    return _cfg_obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
@@ -28,8 +51,22 @@ __all__ = [
     "init",
     "update_config",
     "RedisConfigFetcher",
+    "RedisHashConfigFetcher",
     "config_server_role",
     "envar",
+    "get_index",
     "get_instance",
+    "get_snapshot",
+    "getter",
     "get_config_dir",
+    "add_change_listener",
+    "remove_change_listener",
+    "AsyncRemoteConfigFetcher",
+    "AsyncRedisConfigFetcher",
+    "init_async",
+    "next_change",
+    "EnvarNotSetError",
+    "FetchError",
+    "FileConfigFetcher",
+    "HTTPConfigFetcher",
 ]
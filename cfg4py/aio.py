@@ -0,0 +1,295 @@
+"""Asyncio API.
+
+Remote configuration is refreshed by a task on the running event loop, instead of
+the background scheduler thread used by `config_remote_fetcher`.
+
+```python
+    cfg = await cfg4py.init_async(path, fetcher=AsyncRedisConfigFetcher("my_app"))
+
+    changes = await cfg4py.next_change("services.redis")
+```
+"""
+import asyncio
+import hashlib
+import logging
+from typing import Optional, Union
+
+from cfg4py import core, loaders, metrics
+from cfg4py.backoff import FetchError
+from cfg4py.diff import ChangeSet
+from cfg4py.schedule import RefreshSchedule
+
+logger = logging.getLogger(__name__)
+
+_fetcher = None
+_refresh_task: Optional[asyncio.Task] = None
+
+
+class AsyncRemoteConfigFetcher:
+    """Base class of async fetchers, see `cfg4py.RemoteConfigFetcher`"""
+
+    async def fetch(self) -> dict:
+        raise NotImplementedError("sub class must implement this!")  # pragma: no cover
+
+    async def version(self) -> Optional[str]:
+        """returns the version of remote configuration, without fetching it.
+
+        Fetchers which can't tell the version cheaply return None, then cfg4py always
+        fetches.
+        """
+        return None
+
+    async def watch(self, on_change) -> bool:
+        """start listening to remote changes, call `on_change()` on each of them.
+
+        Fetchers which can't be notified return False, then cfg4py relies on polling
+        only.
+        """
+        return False
+
+    async def unwatch(self):
+        """stop listening to remote changes"""
+
+
+class AsyncRedisConfigFetcher(AsyncRemoteConfigFetcher):
+    def __init__(
+        self,
+        key: str,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        subscribe: bool = False,
+        channel: str = None,
+        version_key: str = None,
+        content_type: str = "application/yaml",
+        **kwargs,
+    ):
+        """
+        Args: see `cfg4py.RedisConfigFetcher`
+        """
+        self.key = key
+        self.version_key = version_key or f"{key}:version"
+        self.subscribe = subscribe
+        self.channel = channel or f"__keyspace@{db}__:{key}"
+        self._notify = channel is not None
+        self._watcher: Optional[asyncio.Task] = None
+        self.loader = loaders.for_content_type(content_type)
+
+        from redis.asyncio import StrictRedis  # type: ignore
+
+        self.client = StrictRedis(
+            host,
+            port=port,
+            db=db,
+            decode_responses=not self.loader.binary,
+            **kwargs,
+        )
+
+    async def fetch(self) -> dict:
+        logger.info("fetching configuration from redis server")
+        settings = await self.client.get(self.key)
+        if settings is None:
+            raise FetchError(f"key {self.key} doesn't exist")
+
+        return core._load_and_replace_envar(settings, loader=self.loader)
+
+    async def version(self) -> Optional[str]:
+        try:
+            return await self.client.get(self.version_key)
+        except Exception as e:  # pragma: no cover
+            logger.warning("failed to get configuration version: %s", e)
+            return None
+
+    async def publish(self, content: Union[str, bytes]):
+        """save `content` as the configuration, along with its digest as version"""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = hashlib.sha1(content).hexdigest()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self.key, content)
+            pipe.set(self.version_key, digest)
+            if self._notify:
+                pipe.publish(self.channel, digest)
+            await pipe.execute()
+
+    async def watch(self, on_change) -> bool:
+        if not self.subscribe:
+            return False
+
+        await self.unwatch()
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self._watcher = asyncio.create_task(self._listen(pubsub, on_change))
+        return True
+
+    async def unwatch(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    async def _listen(self, pubsub, on_change):
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(timeout=1)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # the connection is re-established (and re-subscribed) by next read
+                    logger.warning("lost subscription to configuration changes: %s", e)
+                    await asyncio.sleep(1)
+                    continue
+
+                if message is not None:
+                    logger.info("configuration change notified by %s", self.channel)
+                    on_change()
+        finally:
+            # `close` is deprecated since redis 5.0.1
+            close = getattr(pubsub, "aclose", None) or pubsub.close
+            await close()
+
+
+async def _refresh() -> str:
+    """returns "success", "noop" or "failure", see `core._do_refresh`"""
+    try:
+        with metrics.timer("fetch"):
+            version = await _fetcher.version()
+            if core._is_remote_version_applied(version):
+                metrics.refreshed("noop")
+                core._backoff.reset()
+                return "noop"
+
+            remote = await _fetcher.fetch()
+
+        # the local file watcher applies updates too, in its own thread. Listeners
+        # expect to be called on the loop, so poll for the lock instead of blocking
+        while not core._refresh_lock.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+        try:
+            changed = core._apply_remote(remote, version)
+        finally:
+            core._refresh_lock.release()
+    except Exception as e:
+        core._refresh_failed(e)
+        return "failure"
+
+    core._backoff.reset()
+    return "success" if changed else "noop"
+
+
+async def _refresh_loop(notified: asyncio.Event, outcome: Optional[str]):
+    """
+    Args:
+        outcome: of the refresh done before the loop, None if remote settings are
+         restored instead
+    """
+    schedule = core._schedule
+
+    # the next poll is at a random moment within the interval, to spread a fleet
+    first = True
+
+    while True:
+        try:
+            delay = core._next_delay(outcome, first)
+            first = False
+            await asyncio.wait_for(notified.wait(), delay)
+            # spread the fetches of all subscribers
+            await asyncio.sleep(schedule.notify_delay())
+        except asyncio.TimeoutError:
+            pass
+
+        notified.clear()
+        if not core._backoff.ready():
+            # notified while backing off
+            outcome = None
+            continue
+
+        outcome = await _refresh()
+
+
+async def init_async(
+    local_cfg_path: str = None,
+    fetcher: AsyncRemoteConfigFetcher = None,
+    interval: float = 300,
+    jitter: float = 0.1,
+    max_interval: float = None,
+    notify_jitter: float = 0,
+    **kwargs,
+):
+    """create cfg object, and keep it refreshed from `fetcher` on the running loop
+
+    The first fetch is awaited, so remote settings are available once this returns,
+    unless the last known good ones are restored by `init` (see `cache_dir`), which
+    are reconciled by the first poll then.
+
+    Args:
+        local_cfg_path: see `cfg4py.init`
+        fetcher: the remote fetcher, None for local configuration only.
+        interval: seconds between two polls. If `fetcher` can be notified of remote
+         changes, polling is a fallback.
+        jitter, max_interval, notify_jitter: see `cfg4py.config_remote_fetcher`
+        kwargs: passed to `cfg4py.init`
+
+    Returns:
+        the same as `cfg4py.init`
+    """
+    global _fetcher, _refresh_task
+
+    cfg = core.init(local_cfg_path, **kwargs)
+    await close()
+    if fetcher is None:
+        return cfg
+
+    _fetcher = fetcher
+    notified = asyncio.Event()
+    await fetcher.watch(notified.set)
+    core._schedule = RefreshSchedule(interval, jitter, max_interval, notify_jitter)
+    core._backoff.cap = interval
+    core._backoff.reset()
+    outcome = None
+    if not core._cfg_remote:
+        # nothing to start with, wait for the first fetch
+        outcome = await _refresh()
+    _refresh_task = asyncio.create_task(_refresh_loop(notified, outcome))
+
+    return cfg
+
+
+async def close():
+    """stop refreshing remote configuration"""
+    global _fetcher, _refresh_task
+
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
+
+    if _fetcher is not None:
+        await _fetcher.unwatch()
+        _fetcher = None
+
+
+async def next_change(prefix: str = "") -> ChangeSet:
+    """wait until settings under `prefix` are changed
+
+    Args:
+        prefix: see `cfg4py.add_change_listener`
+
+    Returns:
+        the changes concerning `prefix`
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(changes: ChangeSet):
+        if not future.done():
+            future.set_result(changes)
+
+    def on_change(changes: ChangeSet):
+        # updates may be applied by other threads, like the local file watcher
+        loop.call_soon_threadsafe(resolve, changes)
+
+    core.add_change_listener(prefix, on_change)
+    try:
+        return await future
+    finally:
+        core.remove_change_listener(prefix, on_change)
@@ -0,0 +1,65 @@
+"""Retry policy and timeout budget of remote fetches."""
+import random
+import time
+
+
+class FetchError(Exception):
+    """The remote configuration can't be fetched, or is invalid"""
+
+
+class Backoff:
+    """Exponential backoff with full jitter.
+
+    After n consecutive failures, the next attempt is delayed by a random time in
+    `[0, min(cap, base * 2 ** n))`, so clients failed at the same moment don't retry
+    at the same moment.
+    """
+
+    def __init__(self, base: float = 1, cap: float = 300, rand: random.Random = None):
+        self.base = base
+        self.cap = cap
+        self.failures = 0
+        self._next = 0.0
+        self._random = rand or random.Random()
+
+    def ready(self) -> bool:
+        """if it's time for the next attempt"""
+        return time.monotonic() >= self._next
+
+    def remaining(self) -> float:
+        """seconds until the next attempt is allowed"""
+        return max(0.0, self._next - time.monotonic())
+
+    def failed(self) -> float:
+        """record a failure, returns seconds to wait before the next attempt"""
+        ceiling = min(self.cap, self.base * 2 ** min(self.failures, 32))
+        self.failures += 1
+
+        delay = self._random.uniform(0, ceiling)
+        self._next = time.monotonic() + delay
+        return delay
+
+    def reset(self):
+        """record a success"""
+        self.failures = 0
+        self._next = 0.0
+
+
+class Deadline:
+    """Timeout budget shared by the steps of one fetch"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.end = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """seconds left
+
+        Raises:
+            TimeoutError: if the budget is used up
+        """
+        left = self.end - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"timed out after {self.seconds} seconds")
+
+        return left
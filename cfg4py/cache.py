@@ -0,0 +1,155 @@
+"""On-disk cache of the compiled local configuration.
+
+The merged, env-substituted result of local config files is pickled, so next
+`init()` loads it instead of parsing yaml again. The cache is valid as long as:
+
+* the config files have the same mtime and size
+* the server role is the same
+* environment variables referenced by the files have the same values
+* lists are merged by the same strategy
+
+The last known good remote configuration is saved there too, so `init()` starts
+with it, before the first fetch. It's saved along with its version, thus the first
+refresh doesn't fetch again if the remote configuration is not changed.
+
+Since the result contains substituted environment variables, cache files are only
+readable by the owner, and files owned by others are never loaded.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# bump it when the layout of cache file changes
+FORMAT = 1
+
+
+def make_key(files: List[str], role: str, merge_lists="replace") -> tuple:
+    """returns the key which identifies the compiled result of `files`
+
+    Args:
+        files: local config files, in the order they're merged
+        role: the server role
+        merge_lists: how lists are merged, see `cfg4py.merge`
+
+    Raises:
+        FileNotFoundError: if any of `files` doesn't exist
+    """
+    stats = []
+    for path in files:
+        st = os.stat(path)
+        stats.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+
+    if isinstance(merge_lists, dict):
+        merge_lists = tuple(merge_lists.items())
+
+    return (FORMAT, role, tuple(stats), merge_lists)
+
+
+def _envars_digest(names: Iterable[str]) -> str:
+    # values may be secrets, so only their digest goes into the cache
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        digest.update(f"{name}={os.environ.get(name)!r}\0".encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+def _cache_file(
+    cache_dir: str, config_dir: str, role: str, suffix: str = ".pickle"
+) -> str:
+    name = hashlib.sha1(os.path.abspath(config_dir).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{name[:16]}-{role or 'default'}{suffix}")
+
+
+def _read(path: str) -> Optional[dict]:
+    try:
+        if hasattr(os, "getuid") and os.stat(path).st_uid != os.getuid():
+            logger.warning("%s is not owned by current user, ignored", path)
+            return None
+
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("failed to load config cache %s: %s", path, e)
+        return None
+
+
+def _write(cache_dir: str, path: str, entry: dict):
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        # mkstemp creates the file readable by owner only
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        logger.warning("failed to save config cache %s: %s", path, e)
+
+
+def load(cache_dir: str, config_dir: str, key: tuple) -> Optional[dict]:
+    """returns the cached configuration, or None if it's missing or stale"""
+    path = _cache_file(cache_dir, config_dir, key[1])
+    entry = _read(path)
+    if entry is None:
+        return None
+
+    if entry.get("key") != key:
+        return None
+
+    if entry["envars_digest"] != _envars_digest(entry["envars"]):
+        return None
+
+    logger.debug("configuration is loaded from cache %s", path)
+    return entry["conf"]
+
+
+def save(
+    cache_dir: str, config_dir: str, key: tuple, envars: Iterable[str], conf: dict
+):
+    """save the compiled configuration
+
+    Args:
+        cache_dir: where to save the cache
+        config_dir: the config dir which the configuration is compiled from
+        key: returned by `make_key`
+        envars: names of environment variables referenced by the config files
+        conf: the compiled configuration
+    """
+    envars = sorted(envars)
+    entry = {
+        "key": key,
+        "envars": envars,
+        "envars_digest": _envars_digest(envars),
+        "conf": conf,
+    }
+
+    _write(cache_dir, _cache_file(cache_dir, config_dir, key[1]), entry)
+
+
+def load_remote(cache_dir: str, config_dir: str, role: str) -> Optional[tuple]:
+    """returns (remote configuration, its version) last saved by `save_remote`"""
+    entry = _read(_cache_file(cache_dir, config_dir, role, ".remote.pickle"))
+    if entry is None or entry.get("format") != FORMAT:
+        return None
+
+    return entry["conf"], entry["version"]
+
+
+def save_remote(
+    cache_dir: str, config_dir: str, role: str, conf: dict, version: Optional[str]
+):
+    """save the last known good remote configuration, see `save` for arguments"""
+    entry = {"format": FORMAT, "version": version, "conf": conf}
+    path = _cache_file(cache_dir, config_dir, role, ".remote.pickle")
+    _write(cache_dir, path, entry)
@@ -3,13 +3,10 @@ import os
 import sys
 from typing import Optional
 
-import fire
 from ruamel.yaml import YAML
 
 from cfg4py import enable_logging, envar, init
 
-enable_logging()
-
 
 class Command:
     def __init__(self):
@@ -237,6 +234,9 @@ class Command:
 
 
 def main():
+    import fire
+
+    enable_logging()
     cmd = Command()  # pragma: no cover
     fire.Fire(
         {  # pragma: no cover
@@ -1,109 +1,731 @@
-"""Main module."""
-import logging.config
+"""Main module.
+
+Heavy dependencies (apscheduler, watchdog, ruamel.yaml) are imported on first use,
+keep it that way: `import cfg4py` shouldn't pay for features not used.
+"""
+import copy
+import hashlib
+import logging
 import os
 import re
+import socket
+import threading
+import time
 from collections.abc import Mapping
 from io import StringIO
+from typing import Dict, Iterable, Optional, Sequence, Union
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from ruamel.yaml import YAML
-from ruamel.yaml.error import YAMLError
-from watchdog.events import FileModifiedEvent, FileSystemEventHandler
-from watchdog.observers import Observer
-
+from cfg4py import cache, loaders, metrics
+from cfg4py.backoff import Backoff, FetchError
 from cfg4py.config import Config
+from cfg4py.diff import ChangeLog, ChangeSet, content_hash, diff, is_under
+from cfg4py.envsubst import EnvarNotSetError, compile_template
+from cfg4py.index import FlatIndex
+from cfg4py.merge import merge
+from cfg4py.nodes import FastConfig, LazyConfig, bind, materialize
+from cfg4py.schedule import RefreshSchedule
+from cfg4py.shared import SharedSnapshot
+from cfg4py.snapshot import Snapshot
+from cfg4py.snapshot import current as current_snapshot
+from cfg4py.snapshot import handle as snapshot_handle
+from cfg4py.snapshot import publish as publish_snapshot
 
 logger = logging.getLogger(__name__)
 
 envar = "__cfg4py_server_role__"
-_scheduler = BackgroundScheduler()
+# created by `_get_scheduler` on first use
+_scheduler = None
 _remote_fetcher = None
-_dump_on_change: bool = False
+# True, False or "diff", see `init`
+_dump_on_change: Union[bool, str] = False
 
-yaml = YAML(typ="safe")
+# created by `_get_yaml` on first use
+_yaml = None
 
 # handle local configuration file change
 _local_observer = None
 _cfg_obj = Config()
+# class used to create config nodes, switched by `init(fast=...)`
+_node_cls = Config
+# if True, `update_config` publishes immutable snapshots instead of mutating _cfg_obj
+_snapshot_mode = False
+# if True, config nodes are built on first read, see `init`
+_lazy = False
 
 _cfg_local = {}
 _cfg_remote = {}
+_cfg_remote_hash = None
+_cfg_remote_version = None
+# the configuration as last applied by `update_config`
+_cfg_current = {}
+# (configuration, its content hash), computed on demand by `_digest`
+_cfg_digest: Optional[tuple] = None
+# if True, the next update applies all sections, changed or not
+_reapply = True
+# leaves of `_cfg_current` by dotted path, built on first use, see `get_index`
+_index = FlatIndex(deferred=True)
+# tells a missing value from None
+_missing = object()
+# (key prefix, callback) pairs, see `add_change_listener`
+_change_listeners = []
+# refresh may be triggered by both the scheduler and remote change notifications,
+# and any update of the configuration is made under it. It's reentrant, as change
+# listeners may update the configuration too
+_refresh_lock = threading.RLock()
+# held by the thread running `_refresh`, others just ask it to run once more
+_refresh_gate = threading.Lock()
+_refresh_pending = False
 _strict = True
 
 _local_config_dir: str = ""
+# logging settings applied last time, see `_process_logging_settings`
+_logging_conf = None
+# names of local config files (without extension) to load, from the lowest
+# precedence to the highest, see `init`
+_cascade = ("defaults", "{role}")
+# name (without extension) -> path of config files in the config dir. It's built on
+# first use, and rebuilt only if the watcher sees files created, deleted or moved
+_local_index: Optional[dict] = None
+# digest of local config files when they're loaded, see `_local_files_digest`
+_local_digest = None
+# how lists are merged, see `init` and `cfg4py.merge`
+_merge_lists: Union[str, Dict[str, str]] = "replace"
+# path -> (mtime_ns, size, sha1 of content)
+_local_file_stats = {}
+# where compiled local configuration is cached, see `init`
+_cache_dir: Optional[str] = None
+# when to poll, see `config_remote_fetcher`
+_schedule: Optional[RefreshSchedule] = None
+# delays refreshes after failures
+_backoff = Backoff()
+# configuration shared between processes, see `init`
+_shared: Optional[SharedSnapshot] = None
+_shared_interval: float = 1
+# set to stop the worker thread polling `_shared`
+_shared_stopped: Optional[threading.Event] = None
 
 
 class RemoteConfigFetcher:
     def fetch(self) -> str:
         raise NotImplementedError("sub class must implement this!")  # pragma: no cover
 
+    def version(self) -> Optional[str]:
+        """returns the version of remote configuration, without fetching it.
+
+        It's checked before each fetch, if it's the same as the one of last fetch, the
+        fetch is skipped. Fetchers which can't tell the version cheaply return None,
+        then cfg4py always fetches.
+        """
+        return None
+
+    def watch(self, on_change) -> bool:
+        """start listening to remote changes, call `on_change()` on each of them.
+
+        Fetchers which can't be notified return False, then cfg4py relies on polling
+        only.
+        """
+        return False
+
+    def unwatch(self):
+        """stop listening to remote changes"""
+
 
 class RedisConfigFetcher(RemoteConfigFetcher):
     def __init__(
-        self, key: str, host: str = "localhost", port: int = 6379, db: int = 0, **kwargs
+        self,
+        key: str,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        subscribe: bool = False,
+        channel: str = None,
+        version_key: str = None,
+        content_type: str = "application/yaml",
+        **kwargs,
     ):
+        """
+        Args:
+            key: the key which holds the configuration
+            version_key: the key which holds the version of the configuration,
+             defaults to `{key}:version`. Use `publish` to update both of them. If the
+             version key doesn't exist, the configuration is fetched on every poll.
+            subscribe: if True, refetch once a message arrives at `channel`, thus
+             polling is only a fallback.
+            channel: the pub/sub channel to listen to. Defaults to the keyspace
+             notification channel of `key`, which requires `notify-keyspace-events`
+             of the redis server contains `K` and `$` (or `A`).
+            content_type: format of the configuration, e.g. "application/json", see
+             `cfg4py.loaders`.
+        """
         self.key = key
+        self.version_key = version_key or f"{key}:version"
+        self.subscribe = subscribe
+        self.channel = channel or f"__keyspace@{db}__:{key}"
+        # keyspace notifications are sent by redis itself
+        self._notify = channel is not None
+        self._watcher = None
+        self.loader = loaders.for_content_type(content_type)
+
         from redis import StrictRedis  # type: ignore
 
+        # binary content like msgpack must not be decoded
         self.client = StrictRedis(
-            host, port=port, db=db, decode_responses="utf-8", **kwargs
+            host,
+            port=port,
+            db=db,
+            decode_responses=not self.loader.binary,
+            **kwargs,
         )
 
-    def fetch(self) -> dict:
-        settings = None
+    def version(self) -> Optional[str]:
         try:
-            logger.info("fetching configuration from redis server")
-            settings = self.client.get(self.key)
-            return _load_and_replace_envar(settings)
+            return self.client.get(self.version_key)
         except Exception as e:  # pragma: no cover
-            logger.exception(e)
+            logger.warning("failed to get configuration version: %s", e)
+            return None
+
+    def publish(self, content: Union[str, bytes]):
+        """save `content` as the configuration, along with its digest as version
+
+        Args:
+            content: the configuration, in the format of `content_type`
+        """
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        digest = hashlib.sha1(content).hexdigest()
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self.key, content)
+            pipe.set(self.version_key, digest)
+            if self._notify:
+                pipe.publish(self.channel, digest)
+            pipe.execute()
+
+    def watch(self, on_change) -> bool:
+        if not self.subscribe:
+            return False
+
+        def on_message(message):
+            logger.info("configuration change notified by %s", message["channel"])
+            try:
+                on_change()
+            except Exception as e:
+                logger.exception(e)
+
+        self.unwatch()
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: on_message})
+        self._watcher = pubsub.run_in_thread(
+            sleep_time=1, daemon=True, exception_handler=self._on_watch_error
+        )
+        return True
 
-        return {}
+    def unwatch(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
 
+    @staticmethod
+    def _on_watch_error(e, pubsub, thread):
+        # the connection is re-established (and re-subscribed) by next read
+        logger.warning("lost subscription to configuration changes: %s", e)
+        time.sleep(1)
+
+    def fetch(self) -> dict:
+        logger.info("fetching configuration from redis server")
+        settings = self.client.get(self.key)
+        if settings is None:
+            raise FetchError(f"key {self.key} doesn't exist")
+
+        return _load_and_replace_envar(settings, loader=self.loader)
+
+
+class RedisHashConfigFetcher(RedisConfigFetcher):
+    """Fetches configuration kept in a redis hash, one field per top level section.
+
+    Contents of sections are kept in hash `key`, and their digests in hash
+    `digests_key`. A fetch reads the digests, then only the sections whose digest is
+    changed since last fetch, so only they are transferred and parsed. Sections can
+    be published on their own, e.g. by the teams who own them.
+    """
+
+    def __init__(self, key: str, *args, digests_key: str = None, **kwargs):
+        """
+        Args:
+            key: the hash which holds contents of sections
+            digests_key: the hash which holds digests of sections, defaults to
+             `{key}:digests`
+            args, kwargs: see `RedisConfigFetcher`. The version key is increased by
+             every `publish`. Keyspace notifications of a hash require
+             `notify-keyspace-events` contains `K` and `h` (or `A`).
+        """
+        super().__init__(key, *args, **kwargs)
+        self.digests_key = digests_key or f"{key}:digests"
+        # section -> (digest, parsed content)
+        self._sections: Dict[str, tuple] = {}
+
+    def publish(
+        self,
+        sections: Mapping = None,
+        removed: Iterable[str] = (),
+    ):
+        """save contents of `sections`, and remove sections in `removed`
+
+        Sections which are not mentioned are left untouched.
+
+        Args:
+            sections: {section: content in the format of `content_type`}
+            removed: names of sections to remove
+        """
+        contents, digests = {}, {}
+        for name, content in (sections or {}).items():
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            contents[name] = content
+            digests[name] = hashlib.sha1(content).hexdigest()
+
+        removed = list(removed)
+        with self.client.pipeline(transaction=True) as pipe:
+            if removed:
+                pipe.hdel(self.key, *removed)
+                pipe.hdel(self.digests_key, *removed)
+            if contents:
+                pipe.hset(self.key, mapping=contents)
+                pipe.hset(self.digests_key, mapping=digests)
+            pipe.incr(self.version_key)
+            if self._notify:
+                pipe.publish(self.channel, "changed")
+            pipe.execute()
+
+    def _read(self) -> tuple:
+        """returns ({section: digest}, {section: content}) of changed sections"""
+        if not self._sections:
+            # nothing to compare with, read all in one round trip
+            with self.client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self.digests_key)
+                pipe.hgetall(self.key)
+                digests, contents = pipe.execute()
+
+            contents = {_decode(k): v for k, v in contents.items()}
+        else:
+            digests = self.client.hgetall(self.digests_key)
+            contents = None
+
+        digests = {_decode(k): _decode(v) for k, v in digests.items()}
+        if contents is None:
+            changed = [
+                name
+                for name, digest in digests.items()
+                if self._sections.get(name, (None,))[0] != digest
+            ]
+
+            contents = {}
+            if changed:
+                contents = dict(zip(changed, self.client.hmget(self.key, changed)))
+
+        return digests, contents
+
+    def fetch(self) -> dict:
+        digests, contents = self._read()
+
+        sections = {}
+        for name in digests:
+            content = contents.get(name)
+            if content is None:
+                if name in self._sections:
+                    sections[name] = self._sections[name]
+                continue
+
+            logger.info("section %s of configuration is changed", name)
+            raw = content.encode("utf-8") if isinstance(content, str) else content
+            value = _load_and_replace_envar(content, loader=self.loader)
+            sections[name] = (hashlib.sha1(raw).hexdigest(), value)
+
+        self._sections = sections
+        return {name: sections[name][1] for name in sorted(sections)}
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class LocalConfigChangeHandler:
+    """Handles watchdog events of the config dir.
+
+    Only events of active files (those in the cascade, see `init`) are handled.
+    Editors usually fire a burst of events for one save, so the reload happens
+    `delay` seconds after the last event of a burst.
+
+    watchdog only requires `dispatch`, so it doesn't inherit `FileSystemEventHandler`,
+    which would import watchdog along with cfg4py.
+    """
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self._timer = None
+        self._lock = threading.Lock()
 
-class LocalConfigChangeHandler(FileSystemEventHandler):
     def dispatch(self, event):
-        if not isinstance(event, FileModifiedEvent):
+        global _local_index
+
+        if event.is_directory or event.event_type not in _reload_events:
+            return
+
+        # editors may save by writing a temp file then renaming it to the target
+        names = set()
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            name, ext = os.path.splitext(os.path.basename(path))
+            if loaders.for_extension(ext) is not None:
+                names.add(name)
+
+        if not names:
             return
 
-        ext = os.path.splitext(event.src_path)
-        if ext in [".yml", ".yaml"]:
-            _load_from_local_file()
+        if event.event_type in _index_events:
+            _local_index = None
+
+        if names.isdisjoint(_local_layers()):
+            return
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+
+            self._timer = threading.Timer(self.delay, _reload_local)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+_reload_events = ("modified", "created", "deleted", "moved", "closed")
+# events which change the set of config files
+_index_events = ("created", "deleted", "moved")
+
+
+def _local_layers() -> list:
+    """names of the config files to load, in the order to be merged"""
+    fields = {"role": os.getenv(envar, "").lower(), "hostname": socket.gethostname()}
+
+    names = []
+    for layer in _cascade:
+        try:
+            name = layer.format(env=os.environ, **fields)
+        except KeyError:
+            # referenced environment variable is not set
+            continue
+
+        if name and name not in names:
+            names.append(name)
+
+    return names
 
 
-def _mixin(d, u):
-    # noinspection SpellCheckingInspection
+def _local_file_index() -> dict:
+    """name -> path of config files in the config dir, see `_local_index`
+
+    If a name comes with several extensions, the most used extension in the dir wins,
+    then the first registered one.
     """
-    if  value x in "keyx:valuex" pair is list, it's will be replaced
-    :param d:
-    :param u:
-    :return:
+    global _local_index
+
+    index = _local_index
+    if index is not None:
+        return index
+
+    counter = {}
+    found = {}
+    for f in os.listdir(_local_config_dir):
+        name, ext = os.path.splitext(f)
+        if loaders.for_extension(ext) is None:
+            continue
+
+        counter[ext] = counter.get(ext, 0) + 1
+        found.setdefault(name, []).append(ext)
+
+    exts = loaders.extensions()
+
+    def rank(ext):
+        return -counter[ext], exts.index(ext.lower())
+
+    index = {
+        name: os.path.join(_local_config_dir, name + min(candidates, key=rank))
+        for name, candidates in found.items()
+    }
+    _local_index = index
+    return index
+
+
+def _local_files() -> list:
+    """paths of the config files to load, in the order to be merged
+
+    The first layer of the cascade is required, others are skipped if missing.
+
+    Raises:
+        FileNotFoundError: if file of the first layer doesn't exist
     """
-    u = u or {}
-    d = d or {}
-    for k, v in u.items():
-        if isinstance(v, Mapping):
-            d[k] = _mixin(d.get(k, {}), v)
-        else:
-            d[k] = v
-    return d
+    index = _local_file_index()
+    layers = _local_layers()
+
+    if not layers or layers[0] not in index:
+        raise FileNotFoundError(f"Failed to find {_cascade[0]} configuration file")
+
+    return [index[name] for name in layers if name in index]
+
+
+def _local_files_digest(files: list) -> tuple:
+    """digest of content of `files`, files not changed since last call aren't read"""
+    result = []
+    for path in files:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            result.append((path, None))
+            continue
+
+        cached = _local_file_stats.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            result.append((path, cached[2]))
+            continue
+
+        with open(path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+
+        _local_file_stats[path] = (st.st_mtime_ns, st.st_size, digest)
+        result.append((path, digest))
+
+    return tuple(result)
+
+
+def _reload_local():
+    """reload local config files and apply the result, if their content changed"""
+    global _cfg_local, _local_digest
+
+    try:
+        digest = _local_files_digest(_local_files())
+        if digest == _local_digest:
+            logger.debug("local config files are not changed, skipped")
+            return
+
+        with _refresh_lock:
+            logger.info("local config files are changed, reloading")
+            _cfg_local = _load_from_local_file(reload=True)
+            _local_digest = digest
+            _apply(_merge_remote_local())
+    except Exception as e:
+        logger.exception("failed to reload local config files, kept as is: %s", e)
 
 
 def _to_obj(obj, conf: dict):
     for key, value in conf.items():
         if type(value) == dict:
-            _obj = Config()
+            _obj = _node_cls()
             setattr(obj, key, _obj)
             _to_obj(_obj, value)
         else:
             setattr(obj, key, value)
 
 
-def _refresh():
-    global _cfg_local, _cfg_remote
-    _cfg_remote = _remote_fetcher.fetch()
-    merged = _mixin(_cfg_remote, _cfg_local)
-    update_config(merged)
+def _refresh(first: bool = False):
+    """refresh remote settings, then schedule the next poll
+
+    Refreshes requested while one is running are coalesced into one more run of it,
+    so a burst of notifications doesn't queue up fetches.
+
+    Args:
+        first: if it's the first refresh after `config_remote_fetcher`. The next poll
+         is at a random moment within the interval, to spread a fleet.
+    """
+    global _refresh_pending
+
+    _refresh_pending = True
+    outcome = None
+    ran = False
+    while _refresh_pending and _refresh_gate.acquire(blocking=False):
+        try:
+            _refresh_pending = False
+            with _refresh_lock:
+                outcome = _do_refresh()
+            ran = True
+        finally:
+            _refresh_gate.release()
+
+    if ran:
+        _schedule_refresh(_next_delay(outcome, first))
+
+
+def _do_refresh() -> Optional[str]:
+    """fetch and apply remote settings
+
+    If it fails, the last known good settings are kept, and refreshes are delayed
+    by `_backoff`.
+
+    Returns:
+        "success", "noop" or "failure", None if skipped
+    """
+    # it may be replaced (or removed) by another thread meanwhile
+    fetcher = _remote_fetcher
+    if fetcher is None:
+        return None
+
+    if not _backoff.ready():
+        logger.debug("refresh is skipped, backing off after failures")
+        return None
+
+    try:
+        with metrics.timer("fetch"):
+            version = fetcher.version()
+            if _is_remote_version_applied(version):
+                metrics.refreshed("noop")
+                _backoff.reset()
+                return "noop"
+
+            remote = fetcher.fetch()
+
+        changed = _apply_remote(remote, version)
+    except Exception as e:
+        _refresh_failed(e)
+        return "failure"
+
+    _backoff.reset()
+    return "success" if changed else "noop"
+
+
+def _refresh_failed(e: Exception) -> float:
+    """record a failed refresh, returns seconds to wait before retrying"""
+    metrics.refreshed("failure", e)
+    delay = _backoff.failed()
+    logger.warning(
+        "failed to refresh remote configuration, keep the last known good one, "
+        "retry in %.1f seconds: %r",
+        delay,
+        e,
+    )
+    logger.debug("refresh failed", exc_info=e)
+    return delay
+
+
+def _next_delay(outcome: Optional[str], first: bool = False) -> float:
+    """seconds to wait before the next poll, after a refresh of `outcome`"""
+    if outcome == "failure" or not _backoff.ready():
+        return _backoff.remaining()
+
+    if _schedule is None:
+        return _backoff.cap
+
+    if first:
+        return _schedule.first_delay()
+
+    return _schedule.next_delay(outcome == "success")
+
+
+def _after(seconds: float):
+    import datetime
+
+    return datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+
+
+def _schedule_refresh(delay: float):
+    """(re)schedule the next poll after `delay` seconds"""
+    if _schedule is None or _scheduler is None or not _scheduler.running:
+        return
+
+    # called by the job itself too. The scheduler removes a date job after
+    # submitting it, holding the lock of job stores, so it's added after removal
+    _scheduler.add_job(
+        _refresh,
+        "date",
+        run_date=_after(delay),
+        id="cfg4py_refresh",
+        replace_existing=True,
+    )
+
+
+def _on_remote_change():
+    """called by fetchers on change notifications"""
+    delay = _schedule.notify_delay() if _schedule is not None else 0
+    if delay > 0 and _scheduler is not None and _scheduler.running:
+        _schedule_refresh(delay)
+    else:
+        _refresh()
+
+
+def _is_remote_version_applied(version: Optional[str]) -> bool:
+    if version is not None and version == _cfg_remote_version:
+        logger.debug("remote configuration version %s is not changed", version)
+        return True
+
+    return False
+
+
+def _apply_remote(remote: dict, version: Optional[str] = None) -> bool:
+    """merge remote settings fetched with local ones, and apply the result
+
+    Returns:
+        False if `remote` is the same as last time
+
+    Raises:
+        FetchError: if `remote` is empty. Fetchers used to return an empty dict on
+         failures, it must not wipe out the remote settings.
+    """
+    global _cfg_local, _cfg_remote, _cfg_remote_hash, _cfg_remote_version
+
+    if not remote:
+        raise FetchError("fetched an empty configuration")
+
+    if not isinstance(remote, dict):
+        raise FetchError(f"remote configuration is not a dict: {type(remote)}")
+
+    digest = content_hash(remote)
+    if digest == _cfg_remote_hash:
+        logger.debug("remote configuration is not changed, skipped")
+        if version != _cfg_remote_version:
+            _cfg_remote_version = version
+            _save_remote()
+        metrics.refreshed("noop")
+        return False
+
+    last_good = _cfg_remote, _cfg_remote_hash
+    _cfg_remote, _cfg_remote_hash = remote, digest
+    try:
+        with metrics.timer("merge"):
+            merged = _merge_remote_local()
+
+        _apply(merged)
+    except Exception:
+        _cfg_remote, _cfg_remote_hash = last_good
+        raise
+
+    _cfg_remote_version = version
+    _save_remote()
+    metrics.refreshed("success")
+    return True
+
+
+def _save_remote():
+    """persist remote settings as the last known good ones, see `init`"""
+    if _cache_dir:
+        role = os.getenv(envar, "")
+        cache.save_remote(
+            _cache_dir, _local_config_dir, role, _cfg_remote, _cfg_remote_version
+        )
+
+
+def _restore_remote() -> bool:
+    """load the last known good remote settings persisted by `_save_remote`"""
+    global _cfg_remote, _cfg_remote_hash, _cfg_remote_version
+
+    saved = cache.load_remote(_cache_dir, _local_config_dir, os.getenv(envar, ""))
+    if saved is None:
+        return False
+
+    logger.info("starting with the last known good remote configuration")
+    _cfg_remote, _cfg_remote_version = saved
+    _cfg_remote_hash = content_hash(_cfg_remote)
+    return True
+
+
+def _merge_remote_local() -> dict:
+    """local settings override remote ones. Neither of them is changed, the result
+    shares unchanged sections with them."""
+    return merge(_cfg_remote, _cfg_local, _merge_lists)
 
 
 def enable_logging(level=logging.INFO, log_file=None, file_size=10, file_count=7):
@@ -150,26 +772,81 @@ def enable_logging(level=logging.INFO, log_file=None, file_size=10, file_count=7
         _logger.addHandler(rotating_file)
 
 
-def config_remote_fetcher(fetcher: RemoteConfigFetcher, interval: int = 300):
+def config_remote_fetcher(
+    fetcher: RemoteConfigFetcher,
+    interval: int = 300,
+    jitter: float = 0.1,
+    max_interval: float = None,
+    notify_jitter: float = 0,
+):
     """
     config a remote configuration fetcher, which will pull the settings on every
-     `refresh_interval`
-    Args:
-        fetcher: sub class of `RemoteConfigFetcher`
-        interval: how long should cfg4py to pull the configuration from remote
+     `interval`
 
-    Returns:
+    If the fetcher can be notified of remote changes (see `RemoteConfigFetcher.watch`),
+    it refetches once notified, and polling becomes a fallback, which can use a much
+    longer interval.
 
+    The first refresh runs at once in background, unless remote settings are
+    restored from `cache_dir`. Polls are spread over time, so processes started
+    together don't hit the config store together, see `cfg4py.schedule`.
+    Args:
+        fetcher: sub class of `RemoteConfigFetcher`
+        interval: how long should cfg4py to pull the configuration from remote. The
+         first poll happens at a random moment within `interval`.
+        jitter: max ratio by which each interval is randomly stretched or shrunk
+        max_interval: if greater than `interval`, the interval doubles while the
+         configuration is not changed, up to `max_interval`, and drops back to
+         `interval` after a change.
+        notify_jitter: max seconds to delay a refresh triggered by notification
     """
-    global _remote_fetcher
+    global _remote_fetcher, _schedule
+    if _remote_fetcher is not None and _remote_fetcher is not fetcher:
+        _remote_fetcher.unwatch()
+
     _remote_fetcher = fetcher
+    _schedule = RefreshSchedule(interval, jitter, max_interval, notify_jitter)
+    _backoff.cap = interval
+    _backoff.reset()
+    if _shared is not None and not _shared.is_writer:
+        # the supervisor fetches for all, it's kept in case of taking over
+        return
+
+    _start_polling()
+
+
+def _start_polling():
+    # subscribe first, so changes made before the refresh are not missed
+    _remote_fetcher.watch(_on_remote_change)
+
+    # fetch at once if remote settings are unknown yet. The last known good ones
+    # restored by `init` are reconciled by the first poll, spread like the others
+    restored = bool(_cfg_remote)
+    scheduler = _get_scheduler()
+    scheduler.add_job(
+        _refresh,
+        "date",
+        run_date=_after(_schedule.first_delay() if restored else 0),
+        kwargs={"first": not restored},
+        id="cfg4py_refresh",
+        replace_existing=True,
+    )
+
+    if not scheduler.running:
+        scheduler.start()
+
+
+def _get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        from apscheduler.schedulers.background import BackgroundScheduler
 
-    _scheduler.add_job(_refresh, "interval", seconds=interval)
-    _scheduler.start()
+        _scheduler = BackgroundScheduler()
+
+    return _scheduler
 
 
 def build(save_to: str):
-    global _cfg_obj
     with open(os.path.join(os.path.dirname(__file__), "config.py"), "r") as origin:
         lines = origin.readlines()
         lines.append("\n")
@@ -180,7 +857,7 @@ def build(save_to: str):
     ]
     lines.extend(no_instance)
     with open(save_to, encoding="utf-8", mode="w") as f:
-        lines = _schema_from_obj_(_cfg_obj, lines)
+        lines = _schema_from_obj_(get_instance(), lines)
         content = re.sub("\n+$", "\n", "".join(lines))
 
         f.write(content)
@@ -192,6 +869,9 @@ def _schema_from_obj_(obj, lines, depth: int = 0):
     build a python file for auto-complete.
     """
     depth += 1
+    if isinstance(obj, LazyConfig):
+        materialize(obj)
+
     if isinstance(obj, Config):
         for name in obj.__dict__.copy().keys():
             if name.startswith("__"):
@@ -217,140 +897,623 @@ def _schema_from_obj_(obj, lines, depth: int = 0):
     return lines
 
 
-def init(local_cfg_path: str = None, dump_on_change=True, strict=False):
+def init(
+    local_cfg_path: str = None,
+    dump_on_change: Union[bool, str] = True,
+    strict=False,
+    fast: bool = False,
+    snapshot: bool = False,
+    cache_dir: str = None,
+    cascade: Sequence[str] = None,
+    shared: str = None,
+    shared_interval: float = 1,
+    merge_lists: Union[str, Dict[str, str]] = "replace",
+    lazy: bool = False,
+):
     """
     create cfg object.
     Args:
         local_cfg_path: the directory name where your configuration files exist
         dump_on_change: if configuration is updated, whether or not to dump them into
-         log file
+         log file. If it's "diff", only changed key paths are logged, with values
+         truncated and secrets (passwords, tokens, etc.) redacted.
+        fast: if True, config nodes are plain objects without the per-read access
+         counter, which makes `cfg.x.y.z` as cheap as ordinary attribute reads.
+        snapshot: if True, every update builds a new read-only config tree and
+         publishes it atomically. The returned object is a handle which always reads
+         from the current snapshot, see `get_snapshot`.
+        cache_dir: if provided, the compiled local configuration is cached in this
+         directory, and next `init` loads it without parsing config files, as long
+         as they're not changed. Remote configuration applied is saved there too, so
+         next `init` starts with the last known good remote settings, which are
+         reconciled with the remote server in background once
+         `config_remote_fetcher` is called. The cache contains substituted
+         environment variables, so make sure the directory is private.
+        cascade: names of local config files (without extension) to load, later
+         ones override earlier ones. Names may contain `{role}` (the server role in
+         lower case), `{hostname}` and `{env[NAME]}` (environment variable `NAME`).
+         Defaults to `["defaults", "{role}"]`. Only the first one is required, for
+         example `["defaults", "{env[REGION]}", "{role}", "{hostname}"]`.
+        shared: path of a file to share configuration between processes, e.g. under
+         `/dev/shm`. The first process calls `init` becomes the supervisor, which
+         loads local files, fetches remote configuration and publishes the result
+         there. Others (workers) neither parse nor fetch, but read what's published.
+         If the supervisor exits, a worker takes over. POSIX only.
+        shared_interval: how often (in seconds) workers check for a new version, it
+         costs no more than reading a few bytes from memory.
+        merge_lists: how a list is merged with the one it overrides, when local
+         config files are merged, and local settings are merged over remote ones.
+         One of "replace", "append" and "key:<name>" (items are merged by the field
+         `name`), or {dotted path pattern: strategy}, see `cfg4py.merge`.
+        lazy: if True, a config node is built when it's read for the first time,
+         and kept until its section is changed, so sections never read by the
+         process cost nothing on updates. Like `fast`, reads are not counted. Works
+         with `snapshot` too, where nodes are kept by the snapshot they're part of.
 
     Returns:
     """
     global _local_config_dir, _dump_on_change, _remote_fetcher, _local_observer
-    global _cfg_obj, _cfg_local, _cfg_remote
-    global _strict
+    global _cfg_obj, _cfg_local, _cfg_remote, _reapply
+    global _strict, _node_cls, _snapshot_mode, _cache_dir, _local_digest
+    global _cascade, _local_index, _shared, _merge_lists, _lazy
 
     _strict = strict
+    # validate it before anything is loaded
+    merge({}, {}, merge_lists)
+    _merge_lists = merge_lists
+    _cascade = tuple(cascade) if cascade else ("defaults", "{role}")
+    _cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+    # the mode may change, so the configuration must be applied even if it's the same
+    _reapply = True
+    _snapshot_mode = snapshot
+    _lazy = lazy
+    if lazy:
+        _node_cls = LazyConfig
+    else:
+        _node_cls = FastConfig if fast else Config
+    # switch the root in place, so handles returned earlier stay valid
+    _cfg_obj.__class__ = _node_cls
     _dump_on_change = dump_on_change
     if local_cfg_path:
         _local_config_dir = os.path.expanduser(local_cfg_path)
+        _local_index = None
+
+    _close_shared()
+    if shared:
+        _shared = SharedSnapshot(os.path.expanduser(shared))
+        if not _shared.acquire():
+            _start_shared_worker(shared_interval)
+            return get_instance()
 
+        logger.info("publishing configuration to %s", shared)
+
+    restored = _cache_dir is not None and not _cfg_remote and _restore_remote()
+    if local_cfg_path:
+        _local_digest = _local_files_digest(_local_files())
         _cfg_local = _load_from_local_file()
-        update_config(_mixin(_cfg_remote, _cfg_local))
+        _apply(_merge_remote_local())
+        _watch_local_dir()
+    elif restored:
+        _apply(_merge_remote_local())
+
+    return get_instance()
+
 
+def _watch_local_dir():
+    """(re)start watching the config dir, to reload on changes"""
+    global _local_observer
+
+    if _local_observer is not None:
+        _local_observer.stop()
+        _local_observer = None
+
+    try:
+        # handle local configuration file change, this may not be available on some platform, like apple m1
+        from watchdog.observers import Observer
+
+        _local_observer = Observer()
+        _local_observer.schedule(
+            LocalConfigChangeHandler(), _local_config_dir, recursive=False
+        )
+        _local_observer.start()
+    except Exception as e:
+        logger.exception(e)
+        logger.warning("failed to watch file changes. Hot-reload is not available")
+
+
+def _close_shared():
+    global _shared, _shared_stopped
+
+    if _shared_stopped is not None:
+        _shared_stopped.set()
+        _shared_stopped = None
+
+    if _shared is not None:
+        _shared.close()
+        _shared = None
+
+
+def _start_shared_worker(interval: float):
+    """apply the shared configuration, and keep polling it in a daemon thread"""
+    global _cfg_local, _shared_interval
+
+    _shared_interval = interval
+    conf = _shared.read()
+    if conf is not None:
+        _apply(conf)
+    elif _local_config_dir:
+        # nothing is published yet, use local files until the supervisor does
+        _cfg_local = _load_from_local_file()
+        _apply(_merge_remote_local())
+
+    _start_shared_poller()
+
+
+def _start_shared_poller():
+    global _shared_stopped
+
+    _shared_stopped = threading.Event()
+    thread = threading.Thread(
+        target=_poll_shared,
+        args=(_shared, _shared_interval, _shared_stopped),
+        name="cfg4py-shared",
+        daemon=True,
+    )
+    thread.start()
+
+
+def _poll_shared(shared: SharedSnapshot, interval: float, stopped: threading.Event):
+    while not stopped.wait(interval):
         try:
-            # handle local configuration file change, this may not be available on some platform, like apple m1
-            _local_observer = Observer()
-            _local_observer.schedule(
-                LocalConfigChangeHandler(), _local_config_dir, recursive=False
-            )
-            _local_observer.start()
+            if shared.acquire():
+                logger.info("supervisor of %s is gone, taking over", shared.path)
+                _take_over()
+                return
+
+            conf = shared.read()
+            if conf is not None:
+                _apply(conf)
         except Exception as e:
             logger.exception(e)
-            logger.warning("failed to watch file changes. Hot-reload is not available")
+
+
+def _take_over():
+    """become the supervisor, which loads, fetches and publishes configuration"""
+    global _cfg_local, _local_digest
+
+    with _refresh_lock:
+        if _local_config_dir:
+            _local_digest = _local_files_digest(_local_files())
+            _cfg_local = _load_from_local_file()
+
+        # remote settings are refreshed by polling once started below
+        _apply(_merge_remote_local())
+
+    if _local_config_dir:
+        _watch_local_dir()
+
+    if _remote_fetcher is not None:
+        _start_polling()
+
+
+def _after_fork_in_child():
+    global _refresh_lock, _refresh_gate, _refresh_pending, _scheduler
+    global _local_observer
+
+    if _shared is None:
+        return
+
+    # threads and locks held by them are not inherited, and the supervisor stays
+    # in the parent
+    _refresh_lock = threading.RLock()
+    _refresh_gate = threading.Lock()
+    _refresh_pending = False
+    _scheduler = None
+    _local_observer = None
+    _shared.demote()
+    _start_shared_poller()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_instance():
+    """returns the config object, or the snapshot handle in snapshot mode"""
+    if _snapshot_mode:
+        return snapshot_handle
 
     return _cfg_obj
 
 
+def get_snapshot() -> Snapshot:
+    """returns the current snapshot. Only updated in snapshot mode.
+
+    Read several settings from `get_snapshot().config` to be sure that they come from
+    the same version.
+    """
+    return current_snapshot()
+
+
+def _get_yaml():
+    global _yaml
+    if _yaml is None:
+        from ruamel.yaml import YAML
+
+        _yaml = YAML(typ="safe")
+
+    return _yaml
+
+
 def yaml_dump(conf, options=None):
     if options is None:
         options = {}
     string_stream = StringIO()
     try:
-        yaml.dump(conf, string_stream, **options)
+        _get_yaml().dump(conf, string_stream, **options)
         output_str = string_stream.getvalue()
     finally:
         string_stream.close()
     return output_str
 
 
+class _LazyDump:
+    """dumps the configuration only if the log record is emitted"""
+
+    def __init__(self, conf: dict):
+        self.conf = conf
+
+    def __str__(self):
+        return yaml_dump(self.conf)
+
+
 def update_config(conf: dict):
-    global _cfg_obj
+    """apply `conf`
+
+    In snapshot mode `conf` replaces the whole configuration, otherwise it's applied
+    on top of the current one. Nothing happens if the resulting configuration is
+    the same as the current one. Otherwise, listeners whose prefix is touched by the
+    change are notified, see `add_change_listener`.
+
+    Sections taken from `conf` are copied, so changing it in place afterwards
+    doesn't leak into the configuration, and applying it again picks up the changes.
+    It waits for a refresh or reload in progress, which applies the configuration
+    too.
+    """
+    with _refresh_lock, metrics.timer("apply"):
+        return _update_config(conf, copy=True)
+
+
+def _copy_tree(value):
+    """copies dicts and lists in `value`, other values are shared"""
+    # copying a container and then its containers only is way faster than copying
+    # item by item, as most of the items are leaves
+    if type(value) is dict:
+        value = value.copy()
+        for k, v in value.items():
+            if type(v) is dict or type(v) is list:
+                value[k] = _copy_tree(v)
+    elif type(value) is list:
+        value = value.copy()
+        for i, v in enumerate(value):
+            if type(v) is dict or type(v) is list:
+                value[i] = _copy_tree(v)
+
+    return value
+
+
+def _apply(conf: dict):
+    """`update_config` without copying, for trees which are never changed in place
+
+    Trees loaded or merged by cfg4py are such ones.
+    """
+    with _refresh_lock, metrics.timer("apply"):
+        return _update_config(conf)
+
+
+def _update_config(conf: dict, copy: bool = False):
+    global _cfg_current, _reapply
+
+    current = _cfg_current
+    if _snapshot_mode:
+        merged = dict(conf)
+        removed = [k for k in current if k not in conf]
+    else:
+        # `_to_obj` keeps top level keys which are absent from `conf`
+        merged = {**current, **conf}
+        removed = []
 
-    if "logging" in conf:
-        _process_logging_settings(conf["logging"])
-        logconf = conf["logging"].copy()
+    if _reapply:
+        changed = list(merged)
+    else:
+        # sections equal to the current ones are kept, so are the nodes built of
+        # them. Comparing is much cheaper than hashing or diffing them
+        changed = []
+        for key, value in conf.items():
+            prev = current.get(key, _missing)
+            if prev is value or prev == value:
+                merged[key] = prev
+            else:
+                changed.append(key)
+
+        if not changed and not removed:
+            logger.debug("configuration is not changed, skipped")
+            return get_instance()
 
-        # logging settings usually contains python keywork, for example class
-        # thus these keys cannot be treated as Config's members
-        del conf["logging"]
+    if copy:
+        # the caller may change its tree later, only sections taken are copied
+        for key in changed:
+            if key in conf:
+                merged[key] = _copy_tree(conf[key])
 
-    if _dump_on_change:
-        logger.info("configuration is\n%s", yaml_dump(conf))
+    _cfg_current, _reapply = merged, False
 
-    _to_obj(_cfg_obj, conf)
-    if "logconf" in locals():
+    # the diff is for listeners and logs only, skip it if none of them wants it
+    touched = changed + removed
+    changes = None
+    if _dump_on_change == "diff" or any(
+        is_under(key, prefix) for prefix, _ in _change_listeners for key in touched
+    ):
+        changes = diff(
+            {k: current[k] for k in touched if k in current},
+            {k: merged[k] for k in changed},
+        )
+
+    logconf = merged.get("logging") if "logging" in changed else None
+    if logconf is not None:
+        with metrics.timer("logging"):
+            _process_logging_settings(logconf)
+        logconf = logconf.copy()
+
+    # logging settings usually contains python keywork, for example class
+    # thus these keys cannot be treated as Config's members
+    tree = {k: v for k, v in conf.items() if k != "logging"}
+
+    if _dump_on_change == "diff":
+        logger.info("configuration is changed:\n%s", ChangeLog(changes, merged))
+    elif _dump_on_change:
+        logger.info("configuration is\n%s", _LazyDump(tree))
+
+    if _snapshot_mode:
+        publish_snapshot(merged, raw_keys=("logging",), lazy=_lazy)
+    elif _lazy:
+        # the root stands for all top level keys, not only those in `conf`
+        bind(_cfg_obj, {k: v for k, v in merged.items() if k != "logging"})
+    else:
+        # nodes of unchanged sections are kept
+        _to_obj(_cfg_obj, {k: merged[k] for k in changed if k != "logging"})
+
+    if not _snapshot_mode and logconf is not None:
         _cfg_obj.logging = logconf
 
-    return _cfg_obj
+    # changed sections are indexed again as a whole, so no diff is needed
+    _index.update(ChangeSet(removed=removed, modified=changed), merged)
+
+    if _shared is not None and _shared.is_writer:
+        _shared.write(merged)
+
+    if changes is not None:
+        _notify_change_listeners(changes)
+    return get_instance()
+
+
+def _digest() -> str:
+    """content hash of the current configuration, see `metrics.snapshot`
+
+    It's computed on demand and kept until the configuration is changed, so updates
+    don't pay for it.
+    """
+    global _cfg_digest
+
+    current, cached = _cfg_current, _cfg_digest
+    if cached is None or cached[0] is not current:
+        cached = _cfg_digest = (current, content_hash(current))
+
+    return cached[1]
+
+
+def get_index() -> FlatIndex:
+    """returns the index of current configuration by dotted path
+
+    It's updated along with the configuration, and supports prefix and glob
+    queries and bulk export. It's built on first read, so processes which never
+    read it don't pay for it:
+
+    ```python
+        index = cfg4py.get_index()
+        index.query("services.*.host")
+        os.environ.update(index.to_env("services", env_prefix="MYAPP_"))
+    ```
+    """
+    return _index
+
+
+def getter(path: str, default=None):
+    """returns a callable which reads `path`, e.g. "services.redis.host", from the
+    current configuration
+
+    Leaves are read from the flattened index (see `get_index`), so a read costs one
+    dict lookup however deep `path` is. The callable stays valid across updates,
+    create it once and call it in hot loops. Sections are not indexed, they're read
+    by walking the config object.
+
+    Args:
+        path: dotted path of the setting
+        default: returned if `path` doesn't exist
+    """
+    keys = path.split(".")
+    _index.build()
+    # updated in place, so it's always the current one
+    flat = _index.data
+
+    def get():
+        try:
+            return flat[path]
+        except KeyError:
+            pass
+
+        node = get_instance()
+        try:
+            for key in keys:
+                node = getattr(node, key)
+        except AttributeError:
+            return default
+
+        return node
+
+    return get
+
+
+def add_change_listener(prefix: str, callback):
+    """call `callback` when settings under `prefix` are changed
+
+    The callback receives a `ChangeSet`, which contains only the changes concerning
+    `prefix`. It's called in the thread which applies the update.
+
+    Args:
+        prefix: dotted key path, like "services.redis". Empty string matches all.
+        callback: callable accepts a `ChangeSet`
+    """
+    _change_listeners.append((prefix, callback))
+
+
+def remove_change_listener(prefix: str, callback):
+    try:
+        _change_listeners.remove((prefix, callback))
+    except ValueError:
+        pass
+
+
+def _notify_change_listeners(changes: ChangeSet):
+    for prefix, callback in list(_change_listeners):
+        concerned = changes.under(prefix)
+        if not concerned:
+            continue
+
+        try:
+            callback(concerned)
+        except Exception as e:
+            logger.exception(e)
 
 
 def _process_logging_settings(conf: dict):
-    logging.config.dictConfig(conf)
-
-
-def _guess_extension():
-    files = os.listdir(_local_config_dir)
-    counter = {".yml": 0, ".yaml": 0}
-
-    for f in files:
-        _, ext = os.path.splitext(f)
-        if ext == ".yml":
-            counter[ext] += 1
-        elif ext == ".yaml":
-            counter[ext] += 1
-
-    _max = 0
-    ext = ""
-    for key in counter.keys():
-        if counter[key] > _max:
-            _max = counter[key]
-            ext = key
-
-    if ext in [".yml", ".yaml"]:
-        # noinspection PyPackageRequirements
-        return ext
-    else:
-        msg = "No config files present, or file format is not yaml."
-        raise FileNotFoundError(msg)
+    """apply logging settings, if they're changed since last time
+
+    If only levels are changed, they're set on the affected loggers and handlers,
+    otherwise `dictConfig` rebuilds all handlers, which reopens files and drops
+    buffered records.
+    """
+    global _logging_conf
+    import logging.config
+
+    if conf == _logging_conf:
+        return
+
+    incremental = None
+    if _logging_conf is not None:
+        incremental = _logging_level_changes(_logging_conf, conf)
+
+    try:
+        if incremental is not None:
+            logger.debug("only logging levels are changed: %s", incremental)
+            logging.config.dictConfig(incremental)
+        else:
+            logging.config.dictConfig(conf)
+    except ValueError:
+        if incremental is None:
+            raise
+
+        # for example, the handler has been removed by others
+        logging.config.dictConfig(conf)
+
+    _logging_conf = copy.deepcopy(conf)
+
+
+def _logging_level_changes(old: dict, new: dict) -> Optional[dict]:
+    """returns an incremental logging config which sets changed levels only
+
+    Returns None if settings other than levels are changed, or any level is removed.
+    """
+
+    def without_levels(conf: dict):
+        conf = copy.deepcopy(conf)
+        for item in [conf.get("root")] + [
+            v for k in ("loggers", "handlers") for v in (conf.get(k) or {}).values()
+        ]:
+            if isinstance(item, dict):
+                item.pop("level", None)
+
+        return conf
+
+    if without_levels(old) != without_levels(new):
+        return None
+
+    incremental = {"version": new.get("version", 1), "incremental": True}
+
+    pairs = [("root", None, old.get("root"), new.get("root"))]
+    for section in ("loggers", "handlers"):
+        for name, item in (new.get(section) or {}).items():
+            pairs.append((section, name, old[section][name], item))
+
+    for section, name, prev, item in pairs:
+        level = (item or {}).get("level")
+        if level == (prev or {}).get("level"):
+            continue
+
+        if level is None:
+            return None
+
+        if name is None:
+            incremental[section] = {"level": level}
+        else:
+            incremental.setdefault(section, {})[name] = {"level": level}
+
+    return incremental
 
 
 def get_config_dir():
     return _local_config_dir
 
 
-def _load_and_replace_envar(content: str):
-    """parse content, replace placeholder with environment variables, and load with yaml
+def _load_and_replace_envar(
+    content: Union[str, bytes], envars: set = None, loader: loaders.Loader = None
+):
+    """load content, and substitute placeholders with environment variables
+
+    `${NAME}` and `${NAME:-default}` are supported, see `cfg4py.envsubst`.
 
     Args:
-        content (str): the content of configurations
-    """
-    pattern = re.compile(r".*?\${(\w+)}.*?")
-    match = pattern.findall(content)
-    if match:
-        replaced = content
-        for g in match:
-            replaced = replaced.replace(
-                f"${{{g}}}", os.environ.get(g, f"ERROR_ENVAR_NOT_SET[{g}]")
-            )
-        try:
-            return yaml.load(replaced)
-        except YAMLError as e:
-            logger.error("failed to parse:%s\n", content)
-            raise e
+        content: the content of configurations
+        envars: if provided, names of referenced environment variables are added
+        loader: the parser of content, defaults to yaml
 
+    Raises:
+        EnvarNotSetError: if any referenced variable without default is not set
+    """
+    loader = loader or loaders.get("yaml")
     try:
-        return yaml.load(content)
-    except YAMLError as e:
-        logger.error("failed to parse：%s\n", content)
+        with metrics.timer("parse"):
+            template = compile_template(content, loader.load)
+    except Exception as e:
+        logger.error("failed to parse:%s\n", content)
         raise e
 
+    if envars is not None:
+        envars.update(template.names)
+
+    with metrics.timer("envsubst"):
+        return template.render()
+
 
-def _load_from_local_file() -> dict:
+def _load_from_local_file(reload: bool = False) -> dict:
     """
     read configuration hierarchically from disk
+
+    If `init` is called with `cache_dir`, the compiled result is loaded from there
+    when it's still valid.
     Args:
+        reload: raise on any error, instead of returning what is loaded so far. A
+         broken edit then doesn't replace the configuration in effect.
 
     Returns:
 
@@ -361,43 +1524,53 @@ def _load_from_local_file() -> dict:
 
     role = os.getenv(envar, "")
     if role == "" and _strict:
-        msg = f"You must config environment variables {envar} as one of"
-        "'DEV, TEST, PRODUCTION'"
+        msg = (
+            f"You must config environment variables {envar}, e.g. 'DEV, TEST, "
+            "PRODUCTION'"
+        )
         raise EnvironmentError(msg)
+
+    files = []
     try:
-        ext = _guess_extension()
-        with open(
-            os.path.join(_local_config_dir, f"defaults{ext}"), "r", encoding="utf-8"
-        ) as base:
-            conf = _load_and_replace_envar(base.read(-1))
-
-        if role == "PRODUCTION":
-            with open(
-                os.path.join(_local_config_dir, f"production{ext}"),
-                "r",
-                encoding="utf-8",
-            ) as prod:
-                _prod = _load_and_replace_envar(prod.read(-1))
-                _mixin(conf, _prod)
-
-        elif role == "TEST":
-            with open(
-                os.path.join(_local_config_dir, f"test{ext}"), "r", encoding="utf-8"
-            ) as test:
-                _test = _load_and_replace_envar(test.read(-1))
-                _mixin(conf, _test)
-        elif role == "DEV":
-            with open(
-                os.path.join(_local_config_dir, f"dev{ext}"), "r", encoding="utf-8"
-            ) as dev:
-                _dev = _load_and_replace_envar(dev.read(-1))
-                _mixin(conf, _dev)
-        else:
-            pass
+        files = _local_files()
+
+        key = None
+        if _cache_dir:
+            try:
+                key = cache.make_key(files, role, _merge_lists)
+                cached = cache.load(_cache_dir, _local_config_dir, key)
+                if cached is not None:
+                    return cached
+            except FileNotFoundError:
+                # reported by opening the file below
+                key = None
+
+        envars = set()
+        for path in files:
+            loader = loaders.for_extension(os.path.splitext(path)[1])
+            if loader.binary:
+                with open(path, "rb") as f:
+                    content = f.read(-1)
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read(-1)
+
+            conf = merge(
+                conf, _load_and_replace_envar(content, envars, loader), _merge_lists
+            )
+
+        if key is not None:
+            cache.save(_cache_dir, _local_config_dir, key, envars, conf)
     except FileNotFoundError as e:
-        if e.filename.find("defaults") != -1:
+        if e.filename is None or reload:
+            raise
+        if files and e.filename == files[0]:
             raise FileNotFoundError("Failed to find default configuration file")
+    except EnvarNotSetError:
+        raise
     except Exception as e:
+        if reload:
+            raise
         logger.exception(e)
 
     return conf
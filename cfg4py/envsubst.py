@@ -0,0 +1,191 @@
+"""Environment variable substitution on parsed configuration.
+
+Placeholders are resolved on the parsed tree, not in the raw text:
+
+* `${NAME}` is replaced by the value of environment variable `NAME`, which must be
+  set, otherwise `EnvarNotSetError` is raised.
+* `${NAME:-default}` falls back to `default` if `NAME` is not set.
+
+If a value consists of a single placeholder, the substituted text is typed as a
+plain yaml scalar, for example `port: ${PORT}` gives an int. Otherwise it's a string.
+
+Content is compiled once into a `Template`, which records where the placeholders
+are. Compiled templates are cached by content, so fetching the same blob again
+skips both parsing and scanning.
+"""
+import functools
+import os
+import re
+from typing import Callable, List, Mapping, Optional, Set, Tuple
+
+_placeholder = re.compile(r"\$\{(\w+)(?::-([^}]*))?\}")
+
+# plain scalars of yaml 1.2 core schema
+_null = re.compile(r"^(~|null|Null|NULL)$")
+_bool = re.compile(r"^(true|True|TRUE|false|False|FALSE)$")
+_int = re.compile(r"^([-+]?[0-9]+|0o[0-7]+|0x[0-9a-fA-F]+)$")
+_float = re.compile(
+    r"^([-+]?(\.[0-9]+|[0-9]+(\.[0-9]*)?)([eE][-+]?[0-9]+)?"
+    r"|[-+]?\.(inf|Inf|INF)|\.(nan|NaN|NAN))$"
+)
+
+
+class EnvarNotSetError(EnvironmentError):
+    """Raised if environment variables referenced without default are not set"""
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        super().__init__(f"environment variables not set: {', '.join(names)}")
+
+
+def _resolve_scalar(text: str):
+    if _null.match(text):
+        return None
+    if _bool.match(text):
+        return text.lower() == "true"
+    if _int.match(text):
+        if text.startswith("0o"):
+            return int(text[2:], 8)
+        return int(text, 0) if text.startswith("0x") else int(text)
+    if _float.match(text):
+        lowered = text.lower()
+        if lowered.endswith(".inf"):
+            return float(lowered.replace(".inf", "inf"))
+        if lowered == ".nan":
+            return float("nan")
+        return float(text)
+
+    return text
+
+
+def _parse(text: str) -> Optional[list]:
+    """split `text` into literals and (name, default) pairs, None if no placeholder"""
+    parts = []
+    pos = 0
+    for m in _placeholder.finditer(text):
+        if m.start() > pos:
+            parts.append(text[pos : m.start()])
+        parts.append((m.group(1), m.group(2)))
+        pos = m.end()
+
+    if not parts:
+        return None
+
+    if pos < len(text):
+        parts.append(text[pos:])
+
+    return parts
+
+
+def _render(parts: list, environ: Mapping, missing: list):
+    if len(parts) == 1 and not isinstance(parts[0], str):
+        name, default = parts[0]
+        value = environ.get(name, default)
+        if value is None:
+            missing.append(name)
+            return None
+
+        return _resolve_scalar(value)
+
+    out = []
+    for part in parts:
+        if isinstance(part, str):
+            out.append(part)
+            continue
+
+        name, default = part
+        value = environ.get(name, default)
+        if value is None:
+            missing.append(name)
+            continue
+
+        out.append(value)
+
+    return "".join(out)
+
+
+def _copy(node):
+    if isinstance(node, dict):
+        return {k: _copy(v) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_copy(v) for v in node]
+
+    return node
+
+
+class Template:
+    """Parsed configuration, with locations of its placeholders"""
+
+    __slots__ = ("tree", "values", "keys", "names")
+
+    def __init__(self, tree):
+        self.tree = tree
+        # (path, parts) of values contain placeholders
+        self.values: List[Tuple[tuple, list]] = []
+        # (path of the dict, key, parts) of keys contain placeholders, deepest first
+        self.keys: List[Tuple[tuple, str, list]] = []
+        # names of referenced environment variables
+        self.names: Set[str] = set()
+
+        self._scan(tree, ())
+        self.keys.sort(key=lambda x: -len(x[0]))
+
+    def _scan(self, node, path: tuple):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(key, str) and "${" in key:
+                    parts = _parse(key)
+                    if parts is not None:
+                        self._add_names(parts)
+                        self.keys.append((path, key, parts))
+
+                self._scan(value, path + (key,))
+        elif isinstance(node, list):
+            for i, value in enumerate(node):
+                self._scan(value, path + (i,))
+        elif isinstance(node, str) and "${" in node:
+            parts = _parse(node)
+            if parts is not None:
+                self._add_names(parts)
+                self.values.append((path, parts))
+
+    def _add_names(self, parts: list):
+        self.names.update(p[0] for p in parts if not isinstance(p, str))
+
+    def render(self, environ: Mapping = None):
+        """returns a new tree with placeholders substituted
+
+        Raises:
+            EnvarNotSetError: if any variable without default is not set
+        """
+        environ = os.environ if environ is None else environ
+        tree = _copy(self.tree)
+        missing = []
+
+        for path, parts in self.values:
+            value = _render(parts, environ, missing)
+            if not path:
+                tree = value
+                continue
+
+            container = tree
+            for key in path[:-1]:
+                container = container[key]
+            container[path[-1]] = value
+
+        for path, key, parts in self.keys:
+            container = tree
+            for k in path:
+                container = container[k]
+            container[_render(parts, environ, missing)] = container.pop(key)
+
+        if missing:
+            raise EnvarNotSetError(sorted(set(missing)))
+
+        return tree
+
+
+@functools.lru_cache(maxsize=16)
+def compile_template(content: str, load: Callable) -> Template:
+    """parse `content` by `load`, and locate placeholders in the result"""
+    return Template(load(content))
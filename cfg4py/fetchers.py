@@ -0,0 +1,226 @@
+"""Remote fetchers of configuration served by files and http servers.
+
+Connections to http servers are kept alive and shared by fetchers through a pool,
+so a poll doesn't pay for tcp (and tls) handshakes. Each request is limited by a
+timeout budget, which covers connecting, sending and reading the whole response.
+
+`http.client` is imported on first request, it's not needed by most applications.
+"""
+import logging
+import os
+import threading
+import urllib.parse
+from typing import Dict, Optional
+
+from cfg4py import loaders
+from cfg4py.backoff import Deadline, FetchError
+from cfg4py.core import RemoteConfigFetcher, _load_and_replace_envar
+
+logger = logging.getLogger(__name__)
+
+
+class FileConfigFetcher(RemoteConfigFetcher):
+    """Fetches configuration from a file, e.g. one mounted from a kubernetes config
+    map, or on a network file system.
+
+    The version is told by mtime and size of the file.
+    """
+
+    def __init__(self, path: str, content_type: str = None):
+        """
+        Args:
+            path: the config file
+            content_type: format of the file, told by the extension if omitted
+        """
+        self.path = path
+        if content_type is not None:
+            self.loader = loaders.for_content_type(content_type)
+        else:
+            ext = os.path.splitext(path)[1]
+            self.loader = loaders.for_extension(ext)
+            if self.loader is None:
+                raise ValueError(f"unknown config file type: {path}")
+
+    def version(self) -> Optional[str]:
+        st = os.stat(self.path)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def fetch(self) -> dict:
+        if self.loader.binary:
+            with open(self.path, "rb") as f:
+                content = f.read()
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = f.read()
+
+        return _load_and_replace_envar(content, loader=self.loader)
+
+
+class ConnectionPool:
+    """Idle keep-alive http connections, by (scheme, host, port)"""
+
+    def __init__(self, maxsize: int = 4):
+        """
+        Args:
+            maxsize: max idle connections kept for each server
+        """
+        self.maxsize = maxsize
+        self._idle: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, timeout: float) -> tuple:
+        """returns (connection, whether it's reused) to the server of `key`"""
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+
+        if conn is not None:
+            conn.sock.settimeout(timeout)
+            return conn, True
+
+        import http.client
+
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout), False
+
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def put(self, key: tuple, conn):
+        """return `conn` to the pool after a complete response"""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+
+        conn.close()
+
+    def clear(self):
+        """close all idle connections"""
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+
+        for conn in conns:
+            conn.close()
+
+
+# shared by all http fetchers, unless one is given
+pool = ConnectionPool()
+
+
+class HTTPConfigFetcher(RemoteConfigFetcher):
+    """Fetches configuration from an http server.
+
+    The version is the `ETag` (or `Last-Modified`) header of a HEAD request. Servers
+    which support neither are fetched on every poll, with `If-None-Match`, so
+    unchanged content is not transferred again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        content_type: str = None,
+        headers: dict = None,
+        timeout: float = 10,
+        connections: ConnectionPool = None,
+    ):
+        """
+        Args:
+            url: http or https url of the configuration
+            content_type: format of the configuration. If omitted, it's told by the
+             `Content-Type` header of the response, or yaml if there's none.
+            headers: extra headers of requests, e.g. authorization
+            timeout: seconds budget of one request, including connecting and reading
+             the whole response
+            connections: the pool of keep-alive connections, defaults to the shared
+             `cfg4py.fetchers.pool`
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"not an http url: {url}")
+
+        self.url = url
+        self._key = (parts.scheme, parts.hostname, parts.port)
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.loader = loaders.for_content_type(content_type) if content_type else None
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.connections = connections or pool
+
+        # validator and result of the last fetch
+        self._etag = None
+        self._last = None
+
+    def _request(self, method: str, headers: dict) -> tuple:
+        """returns (response, body)"""
+        import http.client
+
+        deadline = Deadline(self.timeout)
+        while True:
+            conn, reused = self.connections.get(self._key, deadline.remaining())
+            try:
+                conn.request(method, self._path, headers={**self.headers, **headers})
+                conn.sock.settimeout(deadline.remaining())
+                resp = conn.getresponse()
+
+                chunks = []
+                while True:
+                    conn.sock.settimeout(deadline.remaining())
+                    chunk = resp.read1(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+
+                # HEAD responses are not closed by reading
+                resp.close()
+            except (http.client.RemoteDisconnected, ConnectionError) as e:
+                conn.close()
+                if reused:
+                    # the server closed the idle connection, try a new one
+                    logger.debug("keep-alive connection is closed: %s", e)
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self.connections.put(self._key, conn)
+
+            return resp, b"".join(chunks)
+
+    def version(self) -> Optional[str]:
+        resp, _ = self._request("HEAD", {})
+        if resp.status >= 400:
+            # HEAD is not supported, fetch on every poll
+            return None
+
+        return resp.getheader("ETag") or resp.getheader("Last-Modified")
+
+    def fetch(self) -> dict:
+        headers = {}
+        if self._etag is not None:
+            headers["If-None-Match"] = self._etag
+
+        resp, body = self._request("GET", headers)
+        if resp.status == 304:
+            return self._last
+
+        if resp.status != 200:
+            raise FetchError(f"GET {self.url}: {resp.status} {resp.reason}")
+
+        loader = self.loader or loaders.for_content_type(
+            resp.getheader("Content-Type") or "application/yaml"
+        )
+        if loader.binary:
+            content = body
+        else:
+            content = body.decode(resp.headers.get_content_charset("utf-8"))
+
+        conf = _load_and_replace_envar(content, loader=loader)
+        self._etag, self._last = resp.getheader("ETag"), conf
+        return conf
@@ -0,0 +1,293 @@
+"""Flattened view of the configuration, keyed by dotted path.
+
+Only leaves are indexed: `{"services": {"redis": {"host": "h"}}}` gives
+`{"services.redis.host": "h"}`. Lists are leaves too, empty dicts are skipped.
+"""
+import bisect
+import functools
+import json
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cfg4py.diff import ChangeSet, _lookup
+
+
+def flatten(conf: dict, prefix: str = "", out: dict = None) -> dict:
+    """returns {dotted path: value} of leaves in `conf`"""
+    out = {} if out is None else out
+    for key, value in conf.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flatten(value, path + ".", out)
+        else:
+            out[path] = value
+
+    return out
+
+
+_glob_chars = re.compile(r"[*?\[]")
+
+
+def _compile_glob(pattern: str):
+    """`*` and `?` match within a segment, `**` matches any number of segments"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+
+        if c == "*":
+            out.append(r"[^.]*")
+        elif c == "?":
+            out.append(r"[^.]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                chars = pattern[i + 1 : end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                out.append(f"[{chars}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return re.compile("".join(out) + r"\Z")
+
+
+_env_invalid = re.compile(r"[^0-9A-Za-z_]")
+
+
+@functools.lru_cache(maxsize=65536)
+def _env_name(path: str, sep: str) -> str:
+    return sep.join(_env_invalid.sub("_", seg) for seg in path.split(".")).upper()
+
+
+def _env_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, default=str)
+
+    return str(value)
+
+
+class FlatIndex:
+    """Leaves of the configuration by dotted path, with prefix and glob queries.
+
+    It's updated by the `ChangeSet` of each update, so only changed paths are
+    touched. Paths are also kept sorted, a query scans only the paths it matches.
+
+    A deferred index (see `defer`) is built on first read, till then updates only
+    remember the configuration, so it costs nothing if it's never read.
+    """
+
+    def __init__(self, deferred: bool = False):
+        """
+        Args:
+            deferred: if True, it's built on first read, see `defer`
+        """
+        # read by `cfg4py.getter` without lock, so it's updated in place
+        self.data: Dict[str, Any] = {}
+        self._paths: List[str] = []
+        self._lock = threading.Lock()
+        # the configuration to index on first read, None if it's built
+        self._pending: Optional[dict] = {} if deferred else None
+
+    def __len__(self):
+        self.build()
+        return len(self.data)
+
+    def __contains__(self, path: str):
+        self.build()
+        return path in self.data
+
+    def __getitem__(self, path: str):
+        self.build()
+        return self.data[path]
+
+    def get(self, path: str, default=None):
+        self.build()
+        return self.data.get(path, default)
+
+    def defer(self, conf: dict):
+        """drop the index, `conf` is indexed on first read"""
+        with self._lock:
+            self._pending = conf
+            self.data.clear()
+            self._paths = []
+
+    @property
+    def deferred(self) -> bool:
+        """if it's waiting for the first read to be built, see `defer`"""
+        return self._pending is not None
+
+    def build(self):
+        """index the deferred configuration now, if any"""
+        if self._pending is not None:
+            with self._lock:
+                self._build()
+
+    def _build(self):
+        if self._pending is not None:
+            conf, self._pending = self._pending, None
+            self._rebuild(conf)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        """range of `_paths` which starts with `prefix`"""
+        lo = bisect.bisect_left(self._paths, prefix)
+        hi = bisect.bisect_left(self._paths, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _remove(self, path: str):
+        """remove `path` and paths under it"""
+        if path in self.data:
+            del self.data[path]
+            del self._paths[bisect.bisect_left(self._paths, path)]
+
+        lo, hi = self._range(path + ".")
+        for p in self._paths[lo:hi]:
+            del self.data[p]
+        del self._paths[lo:hi]
+
+    def rebuild(self, conf: dict):
+        """index `conf` from scratch"""
+        with self._lock:
+            self._pending = None
+            self._rebuild(conf)
+
+    def _rebuild(self, conf: dict):
+        flat = flatten(conf)
+        self.data.clear()
+        self.data.update(flat)
+        self._paths = sorted(flat)
+
+    def _remove_many(self, paths: List[str]):
+        """remove `paths` and paths under them, with one pass over `_paths`"""
+        for path in paths:
+            self.data.pop(path, None)
+            lo, hi = self._range(path + ".")
+            for p in self._paths[lo:hi]:
+                self.data.pop(p, None)
+
+        self._paths = [p for p in self._paths if p in self.data]
+
+    def update(self, changes: ChangeSet, conf: dict):
+        """apply `changes`, where `conf` is the configuration after the changes"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending = conf
+                return
+
+            changed = changes.added + changes.modified
+            count = len(changes.removed) + len(changed)
+            if count > len(self._paths) // 4:
+                # a large part is changed, indexing from scratch is cheaper
+                self._rebuild(conf)
+                return
+
+            try:
+                if count > 64:
+                    # removing one by one shifts `_paths` each time
+                    self._remove_many(changes.removed + changed)
+                else:
+                    for path in changes.removed + changed:
+                        self._remove(path)
+
+                new = []
+                for path in changed:
+                    value = _lookup(conf, path)
+                    if isinstance(value, dict):
+                        flat = flatten(value, path + ".")
+                    else:
+                        flat = {path: value}
+
+                    self.data.update(flat)
+                    new.extend(flat)
+            except (KeyError, TypeError):
+                # keys containing "." make paths ambiguous
+                self._rebuild(conf)
+                return
+
+            if len(new) > 64:
+                # merging sorted runs is cheaper than inserting one by one
+                self._paths = sorted(self._paths + new)
+            else:
+                for path in new:
+                    bisect.insort(self._paths, path)
+
+    def prefix(self, prefix: str = "") -> Dict[str, Any]:
+        """returns {path: value} of `prefix` and leaves under it"""
+        with self._lock:
+            self._build()
+            if prefix == "":
+                return {p: self.data[p] for p in self._paths}
+
+            result = {}
+            if prefix in self.data:
+                result[prefix] = self.data[prefix]
+
+            lo, hi = self._range(prefix + ".")
+            for p in self._paths[lo:hi]:
+                result[p] = self.data[p]
+
+            return result
+
+    def query(self, pattern: str) -> Dict[str, Any]:
+        """returns {path: value} of leaves matching `pattern`
+
+        Args:
+            pattern: a dotted path, with optional wildcards. `*` matches any
+             characters within one segment, `?` matches one character, `[abc]`
+             matches any of a, b and c, and `**` matches any number of segments,
+             e.g. `services.*.host`.
+        """
+        m = _glob_chars.search(pattern)
+        if m is None:
+            return self.prefix(pattern)
+
+        regex = _compile_glob(pattern)
+        with self._lock:
+            self._build()
+            lo, hi = self._range(pattern[: m.start()])
+            return {
+                p: self.data[p] for p in self._paths[lo:hi] if regex.match(p)
+            }
+
+    def to_dict(self, pattern: str = "") -> Dict[str, Any]:
+        """returns a copy of {path: value} of leaves matching `pattern`"""
+        return self.query(pattern) if pattern else self.prefix()
+
+    def to_env(
+        self, pattern: str = "", env_prefix: str = "", sep: str = "_"
+    ) -> Dict[str, str]:
+        """export leaves matching `pattern` as environment variables
+
+        Names are upper-cased paths with "." replaced by `sep`, and other
+        characters not allowed in names replaced by "_". Values are strings: bools
+        are "true" or "false", None is "", lists are json.
+
+        Args:
+            pattern: see `query`
+            env_prefix: prepended to names, e.g. "MYAPP_"
+            sep: separator of path segments in names
+        """
+        env_prefix = env_prefix.upper()
+        return {
+            env_prefix + _env_name(path, sep): _env_value(value)
+            for path, value in self.to_dict(pattern).items()
+        }
+
+    def paths(self) -> Iterable[str]:
+        """all indexed paths, sorted"""
+        with self._lock:
+            self._build()
+            return list(self._paths)
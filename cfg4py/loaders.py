@@ -0,0 +1,228 @@
+"""Parsers of configuration content, selected by file extension or content type.
+
+Built-in loaders:
+
+| name    | extensions      | content types                                  |
+| ------- | --------------- | ---------------------------------------------- |
+| yaml    | .yaml, .yml     | application/yaml, application/x-yaml, text/yaml |
+| json    | .json           | application/json                               |
+| toml    | .toml           | application/toml                               |
+| msgpack | .msgpack, .mpk  | application/msgpack, application/x-msgpack     |
+
+yaml is parsed by ruamel.yaml, with its C extension (ruamel.yaml.clib) if it's
+installed, else in pure python, which is how cfg4py always parsed it.
+
+PyYAML with libyaml (`CSafeLoader`) is faster, but it's only used if selected by
+`set_yaml_backend("pyyaml-c")`: it implements yaml 1.1, where plain scalars like
+`yes` and `on` are booleans and `010` is octal, so existing files may be read
+differently.
+
+Parsers are imported on first use. Use `register` to add more formats.
+"""
+import json
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class Loader:
+    """A parser of configuration content"""
+
+    __slots__ = ("name", "load", "binary", "extensions", "content_types")
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable,
+        binary: bool = False,
+        extensions: Iterable[str] = (),
+        content_types: Iterable[str] = (),
+    ):
+        self.name = name
+        self.load = load
+        # if True, `load` expects bytes instead of str
+        self.binary = binary
+        self.extensions = tuple(extensions)
+        self.content_types = tuple(content_types)
+
+    def __repr__(self):
+        return f"Loader({self.name!r})"
+
+
+_loaders: Dict[str, Loader] = {}
+_by_extension: Dict[str, Loader] = {}
+_by_content_type: Dict[str, Loader] = {}
+
+
+def register(
+    name: str,
+    load: Callable,
+    extensions: Iterable[str] = (),
+    content_types: Iterable[str] = (),
+    binary: bool = False,
+) -> Loader:
+    """register a loader, replacing the one of the same name, extensions or types
+
+    Args:
+        name: name of the format, e.g. "yaml"
+        load: parses content into dict
+        extensions: file extensions with the leading dot, e.g. ".yaml"
+        content_types: content (mime) types of remote content
+        binary: if True, `load` is given bytes instead of str
+    """
+    loader = Loader(name, load, binary, extensions, content_types)
+    _loaders[name] = loader
+    for ext in loader.extensions:
+        _by_extension[ext.lower()] = loader
+    for content_type in loader.content_types:
+        _by_content_type[content_type.lower()] = loader
+
+    return loader
+
+
+def get(name: str) -> Loader:
+    """returns the loader of format `name`
+
+    Raises:
+        ValueError: if no loader is registered for `name`
+    """
+    try:
+        return _loaders[name]
+    except KeyError:
+        raise ValueError(f"no loader for format {name}")
+
+
+def for_extension(ext: str) -> Optional[Loader]:
+    """returns the loader of file extension `ext`, or None if it's not supported"""
+    return _by_extension.get(ext.lower())
+
+
+def for_content_type(content_type: str) -> Loader:
+    """returns the loader of `content_type`, parameters like charset are ignored
+
+    Raises:
+        ValueError: if `content_type` is not supported
+    """
+    mime = content_type.split(";", 1)[0].strip().lower()
+    try:
+        return _by_content_type[mime]
+    except KeyError:
+        raise ValueError(f"no loader for content type {content_type}")
+
+
+def extensions() -> List[str]:
+    """returns supported file extensions, in order of registration"""
+    return list(_by_extension.keys())
+
+
+# yaml backend name -> factory of its load function
+def _ruamel_c():
+    from _ruamel_yaml import CParser  # noqa: F401
+    from ruamel.yaml import YAML
+
+    return YAML(typ="safe").load
+
+
+def _pyyaml_c():
+    import yaml
+
+    loader = yaml.CSafeLoader
+
+    def load(content):
+        return yaml.load(content, Loader=loader)
+
+    return load
+
+
+def _ruamel():
+    from ruamel.yaml import YAML
+
+    return YAML(typ="safe", pure=True).load
+
+
+_yaml_backends = {"ruamel-c": _ruamel_c, "pyyaml-c": _pyyaml_c, "ruamel": _ruamel}
+# tried in order if no backend is selected, PyYAML is opt-in
+_default_backends = ("ruamel-c", "ruamel")
+# name and load function of the selected backend
+_yaml_backend: Optional[str] = None
+_yaml_load: Optional[Callable] = None
+
+
+def set_yaml_backend(name: str = None):
+    """select the yaml backend, or the default one if `name` is None
+
+    The default is ruamel.yaml, with its C extension if it's installed.
+
+    Args:
+        name: one of "ruamel-c", "pyyaml-c" and "ruamel"
+
+    Raises:
+        ImportError: if the backend is not installed
+    """
+    global _yaml_backend, _yaml_load
+
+    if name is not None and name not in _yaml_backends:
+        raise ValueError(f"unknown yaml backend {name}")
+
+    names = _default_backends if name is None else [name]
+    for i, candidate in enumerate(names):
+        try:
+            _yaml_load = _yaml_backends[candidate]()
+            _yaml_backend = candidate
+            return
+        except (ImportError, AttributeError):
+            # PyYAML built without libyaml has no CSafeLoader
+            if i == len(names) - 1:
+                raise
+
+
+def yaml_backend() -> str:
+    """returns name of the yaml backend in use"""
+    if _yaml_backend is None:
+        set_yaml_backend()
+
+    return _yaml_backend
+
+
+def _load_yaml(content):
+    if _yaml_load is None:
+        set_yaml_backend()
+
+    return _yaml_load(content)
+
+
+def _load_toml(content):
+    try:
+        import tomllib
+    except ImportError:  # pragma: no cover
+        try:
+            import tomli as tomllib
+        except ImportError:
+            import toml
+
+            return toml.loads(content)
+
+    return tomllib.loads(content)
+
+
+def _load_msgpack(content):
+    import msgpack
+
+    return msgpack.unpackb(content, raw=False)
+
+
+register(
+    "yaml",
+    _load_yaml,
+    extensions=(".yaml", ".yml"),
+    content_types=("application/yaml", "application/x-yaml", "text/yaml"),
+)
+register("json", json.loads, extensions=(".json",), content_types=("application/json",))
+register(
+    "toml", _load_toml, extensions=(".toml",), content_types=("application/toml",)
+)
+register(
+    "msgpack",
+    _load_msgpack,
+    extensions=(".msgpack", ".mpk"),
+    content_types=("application/msgpack", "application/x-msgpack"),
+    binary=True,
+)
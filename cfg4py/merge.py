@@ -0,0 +1,164 @@
+"""Non-mutating merge of configuration trees.
+
+`merge(base, override)` returns a new tree without changing either input. Subtrees
+are shared instead of copied: sections which `override` doesn't touch are taken
+from `base` by reference, and sections which `base` doesn't have are taken from
+`override` by reference. Only dicts on the way to an overridden value are copied,
+so the cost depends on the size of `override`, not on the size of `base`. If
+nothing is changed, `base` itself is returned.
+
+As a consequence, the result shares objects with both inputs, treat all of them as
+read-only.
+
+Dicts are merged recursively, anything else in `override` replaces the value in
+`base`, including a dict over a list or a scalar. How two lists are merged is told
+by a strategy:
+
+* "replace": the list of `override` replaces the one of `base`, which is the default
+* "append": items of `override` are appended to those of `base`
+* "key:<name>": items are dicts identified by the field `name`. Items of `override`
+  are merged into the item of `base` with the same `name`, or appended if there's
+  none.
+
+Strategies can be set by dotted path of the list, where `*` matches one segment and
+`**` any number of segments, for example `{"plugins": "key:name", "**": "append"}`.
+The first pattern matched wins, lists matching none are replaced.
+"""
+import functools
+from collections.abc import Mapping
+from typing import Dict, Union
+
+from cfg4py.index import _compile_glob
+
+REPLACE = "replace"
+APPEND = "append"
+_BY_KEY = "key:"
+
+_missing = object()
+
+
+def _check(strategy: str) -> str:
+    if strategy in (REPLACE, APPEND):
+        return strategy
+
+    if (
+        isinstance(strategy, str)
+        and strategy.startswith(_BY_KEY)
+        and strategy[len(_BY_KEY) :]
+    ):
+        return strategy
+
+    raise ValueError(
+        f"unknown list strategy: {strategy!r}, expect 'replace', 'append' or "
+        "'key:<name>'"
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(rules: tuple) -> tuple:
+    return tuple((_compile_glob(pattern), _check(s)) for pattern, s in rules)
+
+
+def _rules(lists: Union[str, Dict[str, str], None]) -> tuple:
+    if lists is None:
+        return ()
+
+    if isinstance(lists, str):
+        return ((None, _check(lists)),)
+
+    return _compile(tuple(lists.items()))
+
+
+def _strategy(rules: tuple, path: str) -> str:
+    for pattern, strategy in rules:
+        if pattern is None or pattern.match(path):
+            return strategy
+
+    return REPLACE
+
+
+def merge(
+    base: Mapping, override: Mapping, lists: Union[str, Dict[str, str]] = REPLACE
+) -> Mapping:
+    """returns `override` merged on top of `base`, neither of them is changed
+
+    Args:
+        base: the configuration with lower precedence
+        override: the configuration with higher precedence
+        lists: strategy of merging lists, or {dotted path pattern: strategy}, see
+         the module doc
+
+    Raises:
+        ValueError: if a strategy is unknown
+    """
+    return _merge(base or {}, override or {}, "", _rules(lists))
+
+
+def _merge(base: Mapping, override: Mapping, prefix: str, rules: tuple) -> Mapping:
+    if not override:
+        return base
+
+    if not base:
+        return override
+
+    merged = None
+    for key, value in override.items():
+        prev = base.get(key, _missing)
+        if prev is _missing:
+            new = value
+        elif isinstance(value, Mapping) and isinstance(prev, Mapping):
+            new = _merge(prev, value, f"{prefix}{key}.", rules)
+        elif isinstance(value, list) and isinstance(prev, list):
+            new = _merge_lists(prev, value, f"{prefix}{key}", rules)
+        else:
+            new = value
+
+        if new is prev:
+            continue
+
+        if merged is None:
+            merged = dict(base)
+        merged[key] = new
+
+    return base if merged is None else merged
+
+
+def _merge_lists(base: list, override: list, path: str, rules: tuple) -> list:
+    strategy = _strategy(rules, path)
+    if strategy == REPLACE:
+        return override
+
+    if not override:
+        return base
+
+    if strategy == APPEND:
+        return base + override if base else override
+
+    key = strategy[len(_BY_KEY) :]
+    positions = {}
+    for i, item in enumerate(base):
+        if isinstance(item, Mapping) and key in item:
+            positions.setdefault(item[key], i)
+
+    merged = None
+    extra = []
+    for item in override:
+        i = None
+        if isinstance(item, Mapping) and key in item:
+            i = positions.get(item[key])
+
+        if i is None:
+            extra.append(item)
+            continue
+
+        prev = base[i] if merged is None else merged[i]
+        new = _merge(prev, item, f"{path}.", rules)
+        if new is not prev:
+            if merged is None:
+                merged = list(base)
+            merged[i] = new
+
+    if extra:
+        merged = (base if merged is None else merged) + extra
+
+    return base if merged is None else merged
@@ -0,0 +1,187 @@
+"""Timings and counters of configuration refreshes.
+
+Stages are timed only when someone is listening, i.e. a hook is added by
+`add_hook`, or `enable` is called. Otherwise a stage costs a function call and a
+no-op context manager. Counters of refreshes are always kept, since a refresh
+happens once in minutes.
+
+Stages:
+
+* fetch: getting the version and content from the remote fetcher, including
+  parse and envsubst of the remote content
+* parse: parsing content of a config file or remote source
+* envsubst: substituting environment variables into the parsed content
+* merge: merging remote settings with local ones
+* apply: `update_config`, including logging
+* logging: reconfiguring logging
+"""
+import contextlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+# enabled by `enable`, rather than by hooks
+_forced = False
+_hooks: List[Callable[[str, float], None]] = []
+_lock = threading.Lock()
+
+# name -> [count, total, max, last], in seconds
+_stages: Dict[str, list] = {}
+_refreshes = {"success": 0, "failure": 0, "noop": 0}
+_last_success: Optional[float] = None
+_last_error: Optional[str] = None
+
+_null = contextlib.nullcontext()
+
+
+def enable(flag: bool = True):
+    """collect stage timings even if there's no hook, so `snapshot` reports them"""
+    global _forced, _enabled
+
+    _forced = flag
+    _enabled = _forced or bool(_hooks)
+
+
+def add_hook(hook: Callable[[str, float], None]):
+    """call `hook(name, value)` on every observation
+
+    `name` is either a stage, with the seconds it took as `value`, or one of
+    "refresh.success", "refresh.failure" and "refresh.noop", with 1 as `value`.
+    Hooks are called in the thread which refreshes the configuration, so they
+    should return quickly. Exceptions raised by hooks are logged and ignored.
+    """
+    global _enabled
+
+    if hook not in _hooks:
+        _hooks.append(hook)
+    _enabled = True
+
+
+def remove_hook(hook: Callable[[str, float], None]):
+    global _enabled
+
+    if hook in _hooks:
+        _hooks.remove(hook)
+    _enabled = _forced or bool(_hooks)
+
+
+def _emit(name: str, value: float):
+    for hook in list(_hooks):
+        try:
+            hook(name, value)
+        except Exception as e:
+            logger.warning("metrics hook %s failed: %s", hook, e)
+
+
+def observe(stage: str, seconds: float):
+    """record that `stage` took `seconds`"""
+    with _lock:
+        stat = _stages.get(stage)
+        if stat is None:
+            _stages[stage] = [1, seconds, seconds, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3] = seconds
+
+    if _hooks:
+        _emit(stage, seconds)
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+
+
+def timer(stage: str):
+    """context manager which times `stage`, or does nothing if nobody listens"""
+    if not _enabled:
+        return _null
+
+    return _Timer(stage)
+
+
+def refreshed(outcome: str, error: Exception = None):
+    """record the outcome of a refresh
+
+    Args:
+        outcome: "success" if new configuration is applied, "noop" if the remote
+         configuration is not changed, or "failure"
+        error: the cause of failure
+    """
+    global _last_success, _last_error
+
+    with _lock:
+        _refreshes[outcome] += 1
+        if outcome == "failure":
+            _last_error = None if error is None else repr(error)
+        else:
+            _last_success = time.monotonic()
+
+    if _hooks:
+        _emit(f"refresh.{outcome}", 1)
+
+
+def staleness() -> Optional[float]:
+    """seconds since the last successful refresh, None if it never succeeded"""
+    if _last_success is None:
+        return None
+
+    return time.monotonic() - _last_success
+
+
+def snapshot() -> dict:
+    """returns current metrics
+
+    Returns:
+        a dict with these keys:
+
+        * stages: {stage: {"count", "total", "max", "last"}}, in seconds
+        * refreshes: {"success": n, "failure": n, "noop": n}
+        * staleness: see `staleness`
+        * last_error: repr of the exception of the last failed refresh
+        * version: version of the applied remote configuration
+        * digest: content hash of the current configuration
+    """
+    from cfg4py import core
+
+    with _lock:
+        stages = {
+            name: dict(zip(("count", "total", "max", "last"), stat))
+            for name, stat in _stages.items()
+        }
+        refreshes = dict(_refreshes)
+
+    return {
+        "stages": stages,
+        "refreshes": refreshes,
+        "staleness": staleness(),
+        "last_error": _last_error,
+        "version": core._cfg_remote_version,
+        "digest": core._digest(),
+    }
+
+
+def reset():
+    """forget all recorded metrics. Hooks are kept."""
+    global _last_success, _last_error
+
+    with _lock:
+        _stages.clear()
+        for outcome in _refreshes:
+            _refreshes[outcome] = 0
+        _last_success = _last_error = None
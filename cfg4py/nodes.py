@@ -0,0 +1,102 @@
+"""Config node types used by the different access modes.
+
+`cfg4py.config.Config` is kept untouched since `cfg4py build` copies its source
+into the generated schema file.
+"""
+from cfg4py.config import Config
+
+
+class FastConfig(Config):
+    """Config node without the per-read access counter.
+
+    Restoring `object.__getattribute__` lets the interpreter take its plain
+    instance attribute path, so reading `cfg.x.y.z` costs three ordinary attribute
+    lookups and no writes.
+    """
+
+    __getattribute__ = object.__getattribute__
+
+
+_missing = object()
+
+
+class LazyConfig(FastConfig):
+    """Config node which creates its children on first read.
+
+    The node keeps the dict it stands for. A child node or leaf is taken from there
+    when it's read for the first time, and cached as an ordinary attribute, so later
+    reads cost the same as `FastConfig`. Sections never read are never built.
+    """
+
+    def __getattr__(self, name):
+        # only called if `name` is not an attribute yet
+        attrs = self.__dict__
+        data = attrs.get("__cfg4py_data__", {})
+        try:
+            value = data[name]
+        except KeyError:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            ) from None
+
+        value = self.__cfg4py_child__(value)
+        # don't cache it if the node is bound to new data meanwhile
+        if attrs.get("__cfg4py_data__") is data:
+            attrs[name] = value
+
+        return value
+
+    def __cfg4py_child__(self, value):
+        if type(value) is dict:
+            return lazy_node(type(self), value)
+
+        return value
+
+    def __dir__(self):
+        data = self.__dict__.get("__cfg4py_data__", ())
+        return sorted(set(super().__dir__()) | {k for k in data if isinstance(k, str)})
+
+
+def lazy_node(cls, data: dict, previous: LazyConfig = None) -> LazyConfig:
+    """returns a node of `cls` which stands for `data`
+
+    Args:
+        cls: `LazyConfig` or its subclass
+        data: the section
+        previous: a node standing for an older version of the section. Its children
+         already built are reused if their data is the same object, i.e. it's not
+         changed, see `cfg4py.merge`.
+    """
+    node = cls()
+    attrs = node.__dict__
+    if previous is not None:
+        # readers may add children to `previous` meanwhile
+        cached = previous.__dict__.copy()
+        old = cached.get("__cfg4py_data__", {})
+        for key, value in cached.items():
+            if key in data and old.get(key, _missing) is data[key]:
+                attrs[key] = value
+
+    attrs["__cfg4py_data__"] = data
+    return node
+
+
+def bind(node: LazyConfig, data: dict):
+    """make `node` stand for `data` from now on
+
+    Children already built are kept if their data is not changed, others are built
+    again on next read. Attributes not in `data` are kept.
+    """
+    attrs = node.__dict__
+    old = attrs.get("__cfg4py_data__", {})
+    attrs["__cfg4py_data__"] = data
+    for key in attrs.copy():
+        if key in data and old.get(key, _missing) is not data[key]:
+            attrs.pop(key, None)
+
+
+def materialize(node: LazyConfig):
+    """build all children of `node`, e.g. to walk it by `__dict__`"""
+    for key in node.__dict__.get("__cfg4py_data__", ()):
+        if isinstance(key, str):
+            getattr(node, key)
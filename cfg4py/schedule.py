@@ -0,0 +1,67 @@
+"""When to poll remote configuration.
+
+Processes started by the same deploy would poll the config store at the same
+moments if they all used a fixed interval. The schedule spreads them:
+
+* the first poll happens at a random moment within the first interval
+* each interval is stretched or shrunk by a random ratio, within `jitter`
+* while the configuration is stable, the interval doubles up to `max_interval`,
+  and drops back to `interval` once a change is seen
+* refreshes triggered by change notifications can be delayed by a random time
+  within `notify_jitter`, otherwise every subscriber fetches at the same instant
+"""
+import random
+
+
+class RefreshSchedule:
+    def __init__(
+        self,
+        interval: float,
+        jitter: float = 0.1,
+        max_interval: float = None,
+        notify_jitter: float = 0,
+        rand: random.Random = None,
+    ):
+        """
+        Args:
+            interval: seconds between two polls
+            jitter: max ratio by which an interval is randomly stretched or shrunk
+            max_interval: if greater than `interval`, the interval doubles on every
+             poll which sees no change, up to this
+            notify_jitter: max seconds to delay a refresh triggered by notification
+            rand: source of randomness, for tests and simulations
+        """
+        if not 0 <= jitter < 1:
+            raise ValueError(f"jitter must be in [0, 1), got {jitter}")
+
+        self.interval = interval
+        self.jitter = jitter
+        self.max_interval = max(interval, max_interval or interval)
+        self.notify_jitter = notify_jitter
+        # the interval before jitter
+        self.current = interval
+        self._random = rand or random.Random()
+
+    def first_delay(self) -> float:
+        """seconds to wait before the first poll"""
+        return self._random.uniform(0, self.interval)
+
+    def next_delay(self, changed: bool) -> float:
+        """seconds to wait before the next poll
+
+        Args:
+            changed: if the last refresh applied a change
+        """
+        if changed:
+            self.current = self.interval
+        else:
+            self.current = min(self.max_interval, self.current * 2)
+
+        return self.current * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def notify_delay(self) -> float:
+        """seconds to wait before refreshing on a change notification"""
+        if self.notify_jitter <= 0:
+            return 0
+
+        return self._random.uniform(0, self.notify_jitter)
@@ -0,0 +1,201 @@
+"""Configuration shared by processes through a memory-mapped file.
+
+The file starts with a header of (magic, sequence, payload length), followed by the
+pickled configuration. The writer increases the sequence before and after writing
+the payload, so it's odd while writing. Readers retry if the sequence is odd, or
+changed during their read (a seqlock). The version is half of the sequence.
+
+Only the process holding the lock (`acquire`) writes, and only it opens and maps
+the file writable. Readers poll the version, which costs one read of the header,
+and deserialize only if it's changed.
+
+It relies on `fcntl.flock`, thus is available on POSIX only.
+"""
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CFG4PYSM"
+# magic, sequence, payload length
+_header = struct.Struct("<8sQQ")
+
+
+class SharedSnapshot:
+    """A configuration snapshot in the memory-mapped file `path`"""
+
+    def __init__(self, path: str):
+        """
+        Raises:
+            PermissionError: if the file is owned by others. It's unpickled by
+             readers, so only the owner should be able to write it.
+        """
+        self.path = path
+        self._fd = None
+        self._lock_fd = None
+        self._mm: Optional[mmap.mmap] = None
+        # sequence of the last read or write
+        self._seen = 0
+        self._open(os.O_RDONLY)
+
+    def _open(self, flags: int):
+        """(re)open the file with `flags`, the current map is dropped"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+        fd = os.open(self.path, flags | os.O_CREAT, 0o600)
+        if hasattr(os, "getuid") and os.fstat(fd).st_uid != os.getuid():
+            os.close(fd)
+            raise PermissionError(f"{self.path} is not owned by current user")
+
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = fd
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_fd is not None
+
+    def acquire(self) -> bool:
+        """try to become the writer, without blocking
+
+        Returns:
+            True if the lock is acquired, False if another process holds it
+        """
+        import fcntl
+
+        if self._lock_fd is not None:
+            return True
+
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        try:
+            self._open(os.O_RDWR)
+        except OSError:
+            os.close(fd)
+            raise
+
+        self._lock_fd = fd
+        return True
+
+    def demote(self):
+        """give up the writer role, without releasing the lock
+
+        Used in a forked child, whose copy of the lock is shared with the parent.
+        """
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            self._open(os.O_RDONLY)
+
+    def close(self):
+        """release the lock if held, and unmap the file"""
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _map(self) -> Optional[mmap.mmap]:
+        """(re)map the whole file, None if it's too small to hold the header"""
+        size = os.fstat(self._fd).st_size
+        if self._mm is not None:
+            if len(self._mm) == size:
+                return self._mm
+            self._mm.close()
+            self._mm = None
+
+        if size < _header.size:
+            return None
+
+        access = mmap.ACCESS_WRITE if self.is_writer else mmap.ACCESS_READ
+        self._mm = mmap.mmap(self._fd, size, access=access)
+        return self._mm
+
+    def _read_header(self, mm: mmap.mmap) -> tuple:
+        magic, seq, length = _header.unpack_from(mm, 0)
+        if magic != MAGIC:
+            return 0, 0
+
+        return seq, length
+
+    def version(self) -> int:
+        """version of the configuration in the file, 0 if nothing is written yet"""
+        mm = self._mm if self._mm is not None else self._map()
+        if mm is None:
+            return 0
+
+        return self._read_header(mm)[0] // 2
+
+    def write(self, conf: dict):
+        """publish `conf` as the next version. Only the writer calls it."""
+        payload = pickle.dumps(conf, protocol=pickle.HIGHEST_PROTOCOL)
+        size = _header.size + len(payload)
+
+        mm = self._map()
+        if mm is None or len(mm) < size:
+            # grow by pages with some room, so it's not resized on every write
+            capacity = (size * 2 + mmap.PAGESIZE - 1) // mmap.PAGESIZE * mmap.PAGESIZE
+            os.ftruncate(self._fd, capacity)
+            mm = self._map()
+
+        seq, length = self._read_header(mm)
+        seq += seq & 1
+        _header.pack_into(mm, 0, MAGIC, seq + 1, length)
+        mm[_header.size : size] = payload
+        _header.pack_into(mm, 0, MAGIC, seq + 2, len(payload))
+        self._seen = seq + 2
+
+    def read(self, timeout: float = 1) -> Optional[dict]:
+        """returns the configuration if its version changed since last read or write
+
+        Returns:
+            the configuration, or None if nothing is written yet or it's not changed
+
+        Raises:
+            TimeoutError: if a consistent copy can't be read in `timeout` seconds,
+             which means the writer died in the middle of a write.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            mm = self._mm if self._mm is not None else self._map()
+            if mm is None:
+                return None
+
+            seq, length = self._read_header(mm)
+            if seq == 0 or seq == self._seen:
+                return None
+
+            if not seq & 1:
+                end = _header.size + length
+                if end > len(mm):
+                    # the file has grown
+                    self._map()
+                    continue
+
+                payload = mm[_header.size : end]
+                if self._read_header(mm)[0] == seq:
+                    self._seen = seq
+                    return pickle.loads(payload)
+
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"failed to read {self.path}, being written")
+
+            time.sleep(0.001)
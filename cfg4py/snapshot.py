@@ -0,0 +1,147 @@
+"""Immutable configuration snapshots.
+
+A snapshot is built off to the side from a plain dict, then published by swapping
+a single module level reference. Readers never take a lock: they either see the
+previous snapshot or the new one, never a mix of both.
+"""
+import copy
+import threading
+from typing import Iterable
+
+from cfg4py.nodes import FastConfig, LazyConfig, lazy_node
+
+
+class FrozenConfig(FastConfig):
+    """Read-only config node, the building block of a snapshot"""
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"config snapshot is read-only, can't set '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"config snapshot is read-only, can't delete '{name}'")
+
+
+class LazyFrozenConfig(LazyConfig, FrozenConfig):
+    """Read-only config node which builds its children on first read.
+
+    Children are cached in the node, thus belong to the snapshot it's part of.
+    """
+
+    def __cfg4py_child__(self, value):
+        if isinstance(value, dict):
+            return lazy_node(type(self), value)
+
+        if isinstance(value, (str, int, float, bool, type(None))):
+            return value
+
+        return copy.deepcopy(value)
+
+
+class Snapshot:
+    """A published version of the configuration.
+
+    Attributes:
+        version: increased by one on every publish, starts from 0 (empty config)
+        config: root node of the frozen tree
+        data: the dict which the tree was built from. Treat it as read-only.
+    """
+
+    __slots__ = ("version", "config", "data")
+
+    def __init__(self, version: int, config: FrozenConfig, data: dict):
+        self.version = version
+        self.config = config
+        self.data = data
+
+    def __repr__(self):
+        return f"<Snapshot version={self.version}>"
+
+
+def freeze(conf: dict, raw_keys: Iterable[str] = ()) -> FrozenConfig:
+    """build a frozen tree from `conf`
+
+    Leaf values are deep-copied, so later changes to `conf` won't leak into the tree.
+
+    Args:
+        conf: the configuration
+        raw_keys: top level keys whose value are kept as (copied) dict instead of
+            being converted into nodes, for example `logging`.
+    """
+    node = FrozenConfig()
+    # bypass FrozenConfig.__setattr__ while the node is still private to us
+    attrs = node.__dict__
+    for key, value in conf.items():
+        if isinstance(value, dict) and key not in raw_keys:
+            attrs[key] = freeze(value)
+        elif isinstance(value, (str, int, float, bool, type(None))):
+            attrs[key] = value
+        else:
+            attrs[key] = copy.deepcopy(value)
+
+    return node
+
+
+_current = Snapshot(0, FrozenConfig(), {})
+# serializes writers only, readers go straight to `_current`
+_publish_lock = threading.Lock()
+
+
+def publish(conf: dict, raw_keys: Iterable[str] = (), lazy: bool = False) -> Snapshot:
+    """build a new snapshot from `conf` and make it the current one
+
+    Args:
+        conf: the full configuration. Keys absent from `conf` are absent from the
+            new snapshot.
+        raw_keys: see `freeze`
+        lazy: if True, nodes are built on first read. Those already built in the
+            current snapshot are reused if their sections are not changed. `conf`
+            must not be changed afterwards.
+    """
+    global _current
+
+    root = None if lazy else freeze(conf, raw_keys)
+    with _publish_lock:
+        if lazy:
+            previous = _current.config
+            if not isinstance(previous, LazyFrozenConfig):
+                previous = None
+
+            root = lazy_node(LazyFrozenConfig, conf, previous)
+            for key in raw_keys:
+                if key in conf:
+                    root.__dict__[key] = copy.deepcopy(conf[key])
+
+        snapshot = Snapshot(_current.version + 1, root, conf)
+        _current = snapshot
+
+    return snapshot
+
+
+def current() -> Snapshot:
+    return _current
+
+
+class ConfigHandle:
+    """Stable handle which always reads from the current snapshot.
+
+    Each attribute read through the handle resolves against whatever snapshot is
+    current at that moment. To read several settings from one consistent version,
+    hold `current().config` instead.
+    """
+
+    __slots__ = ()
+
+    def __getattribute__(self, name):
+        return getattr(_current.config, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"config snapshot is read-only, can't set '{name}'")
+
+    def __dir__(self):
+        return dir(_current.config)
+
+    def __repr__(self):
+        return f"<ConfigHandle version={_current.version}>"
+
+
+handle = ConfigHandle()
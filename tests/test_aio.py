@@ -0,0 +1,174 @@
+"""Tests for the asyncio API."""
+import asyncio
+import os
+import threading
+import unittest
+from unittest import mock
+
+import fakeredis
+import fakeredis.aioredis
+
+import cfg4py
+from cfg4py import aio, core
+
+
+class TestAio(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+        self.server = fakeredis.FakeServer()
+
+        patcher = mock.patch("redis.asyncio.StrictRedis", fakeredis.aioredis.FakeRedis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+
+    def test_init_async(self):
+        async def run():
+            fetcher = cfg4py.AsyncRedisConfigFetcher(
+                "my_app_config", subscribe=True, channel="config", server=self.server
+            )
+            await fetcher.publish('{"services": {"redis2": {"host": "192.168.3.2"}}}')
+
+            cfg = await cfg4py.init_async(
+                self.resource_path,
+                fetcher=fetcher,
+                interval=3600,
+                dump_on_change=False,
+            )
+
+            try:
+                # the first fetch is awaited
+                self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+                self.assertEqual("127.0.0.1", cfg.services.redis.host)
+
+                waiter = asyncio.ensure_future(cfg4py.next_change("services.redis2"))
+                await asyncio.sleep(0)
+                await fetcher.publish(
+                    '{"services": {"redis2": {"host": "192.168.3.3"}}}'
+                )
+                changes = await asyncio.wait_for(waiter, 5)
+
+                self.assertEqual(["services.redis2.host"], changes.modified)
+                self.assertEqual("192.168.3.3", cfg.services.redis2.host)
+            finally:
+                await aio.close()
+
+        asyncio.run(run())
+
+    def test_restored(self):
+        refreshed = []
+
+        async def refresh():
+            refreshed.append(True)
+            return "noop"
+
+        async def run():
+            fetcher = cfg4py.AsyncRedisConfigFetcher(
+                "my_app_config", server=self.server
+            )
+            # as if restored from cache_dir
+            core._cfg_remote = {"services": {"redis2": {"host": "192.168.3.2"}}}
+            with mock.patch("cfg4py.aio._refresh", refresh):
+                await cfg4py.init_async(
+                    self.resource_path,
+                    fetcher=fetcher,
+                    interval=3600,
+                    dump_on_change=False,
+                )
+                try:
+                    # reconciled by the first poll, instead of a fetch at once
+                    await asyncio.sleep(0.1)
+                    self.assertEqual([], refreshed)
+                finally:
+                    await aio.close()
+
+        asyncio.run(run())
+
+    def test_polling(self):
+        async def run():
+            fetcher = cfg4py.AsyncRedisConfigFetcher(
+                "my_app_config", server=self.server
+            )
+            await fetcher.publish('{"services": {"redis2": {"host": "192.168.3.2"}}}')
+
+            cfg = await cfg4py.init_async(
+                self.resource_path, fetcher=fetcher, interval=0.1, dump_on_change=False
+            )
+            try:
+                await fetcher.publish(
+                    '{"services": {"redis2": {"host": "192.168.3.3"}}}'
+                )
+                await asyncio.wait_for(cfg4py.next_change(), 5)
+                self.assertEqual("192.168.3.3", cfg.services.redis2.host)
+            finally:
+                await aio.close()
+
+        asyncio.run(run())
+
+    def test_refresh_holds_lock(self):
+        class Fetcher(aio.AsyncRemoteConfigFetcher):
+            async def fetch(self):
+                return {"services": {"redis2": {"host": "192.168.3.2"}}}
+
+        held = []
+
+        def probe():
+            # the lock is reentrant, so it's probed from another thread
+            if core._refresh_lock.acquire(blocking=False):
+                core._refresh_lock.release()
+                held.append(False)
+            else:
+                held.append(True)
+
+        def apply(remote, version):
+            # on the loop, where listeners expect to be called
+            held.append(threading.current_thread() is threading.main_thread())
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return True
+
+        async def run():
+            aio._fetcher = Fetcher()
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(True)
+                    await asyncio.sleep(0.01)
+
+            # a reload in progress in another thread
+            held_by_reload, release = threading.Event(), threading.Event()
+
+            def reload():
+                with core._refresh_lock:
+                    held_by_reload.set()
+                    release.wait(5)
+
+            thread = threading.Thread(target=reload)
+            thread.start()
+            held_by_reload.wait(5)
+            ticker = asyncio.ensure_future(tick())
+            try:
+                with mock.patch("cfg4py.core._apply_remote", apply):
+                    refresh = asyncio.ensure_future(aio._refresh())
+                    await asyncio.sleep(0.1)
+                    # waiting for the lock, without blocking the loop
+                    self.assertFalse(refresh.done())
+                    self.assertGreater(len(ticks), 3)
+
+                    release.set()
+                    self.assertEqual("success", await refresh)
+            finally:
+                release.set()
+                thread.join()
+                ticker.cancel()
+                aio._fetcher = None
+
+        asyncio.run(run())
+        self.assertEqual([True, True], held)
@@ -0,0 +1,125 @@
+"""Tests for the compiled config cache."""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import cfg4py
+from cfg4py import core
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        os.environ["cfg4py_account"] = "aaron"
+
+        self.root = tempfile.mkdtemp()
+        self.config_dir = os.path.join(self.root, "config")
+        self.cache_dir = os.path.join(self.root, "cache")
+        os.makedirs(self.config_dir)
+
+        self.write("defaults.yaml", "account: ${cfg4py_account}\nhost: localhost\n")
+        self.write("test.yaml", "host: 127.0.0.1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        core._cache_dir = None
+        self.forget_remote()
+        if core._local_observer is not None:
+            core._local_observer.stop()
+            core._local_observer = None
+
+    def forget_remote(self):
+        core._remote_fetcher = None
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+
+    def write(self, name: str, content: str):
+        with open(os.path.join(self.config_dir, name), "w") as f:
+            f.write(content)
+
+    def init(self):
+        return cfg4py.init(self.config_dir, dump_on_change=False, cache_dir=self.cache_dir)
+
+    def test_warm_start(self):
+        cfg = self.init()
+        self.assertEqual("aaron", cfg.account)
+        self.assertEqual("127.0.0.1", cfg.host)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+        with mock.patch(
+            "cfg4py.core._load_and_replace_envar",
+            side_effect=Exception("I should NOT be invoked"),
+        ):
+            cfg = self.init()
+            self.assertEqual("aaron", cfg.account)
+            self.assertEqual("127.0.0.1", cfg.host)
+
+    def test_merge_lists(self):
+        self.write("defaults.yaml", "hosts: [a]\n")
+        self.write("test.yaml", "hosts: [b]\n")
+
+        self.assertEqual(["b"], self.init().hosts)
+
+        # the cached result was merged by another strategy
+        cfg = cfg4py.init(
+            self.config_dir,
+            dump_on_change=False,
+            cache_dir=self.cache_dir,
+            merge_lists="append",
+        )
+        self.assertEqual(["a", "b"], cfg.hosts)
+
+    def test_invalidate(self):
+        self.init()
+
+        # file changed
+        time.sleep(0.01)
+        self.write("test.yaml", "host: 192.168.3.1\n")
+        self.assertEqual("192.168.3.1", self.init().host)
+
+        # referenced environment variable changed
+        os.environ["cfg4py_account"] = "yang"
+        self.assertEqual("yang", self.init().account)
+
+        # role changed
+        os.environ[cfg4py.envar] = "DEV"
+        self.assertEqual("localhost", self.init().host)
+
+    def test_broken_cache(self):
+        self.init()
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), "wb") as f:
+                f.write(b"broken")
+
+        self.assertEqual("127.0.0.1", self.init().host)
+
+    def test_last_known_good_remote(self):
+        class Fetcher(cfg4py.RemoteConfigFetcher):
+            def version(self):
+                return "v1"
+
+            def fetch(self):
+                return {"host": "192.168.3.1", "tz": "UTC"}
+
+        self.forget_remote()
+        self.init()
+        core._remote_fetcher = fetcher = Fetcher()
+        core._backoff.reset()
+        core._refresh()
+        self.assertEqual(2, len(os.listdir(self.cache_dir)))
+
+        # restarted, remote settings are available before any fetch
+        self.forget_remote()
+        cfg = self.init()
+        self.assertEqual("UTC", cfg.tz)
+        # local settings still override remote ones
+        self.assertEqual("127.0.0.1", cfg.host)
+
+        # reconciled: the version is not changed, so it's not fetched again
+        core._remote_fetcher = fetcher
+        with mock.patch.object(fetcher, "fetch") as fetch:
+            core._refresh()
+            fetch.assert_not_called()
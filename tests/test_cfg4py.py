@@ -5,6 +5,7 @@ import os
 import shutil
 import sys
 import tempfile
+import threading
 import time
 import unittest
 from unittest import mock
@@ -62,14 +63,17 @@ class TestCfg4Py(unittest.TestCase):
         }
 
         cfg4py.update_config(conf)
-        core.build(os.path.join(self.resource_path, "schema.py"))
-        try:
-            sys.path.insert(0, self.resource_path)
-            
-            # no exception means the file has been generated successfully
-            self.assertTrue(True)
-        except Exception:
-            self.assertTrue(False)
+
+        # not into resources, schema.py there is shipped with the package
+        os.makedirs(self.output)
+        schema = os.path.join(self.output, "schema.py")
+        core.build(schema)
+
+        with open(schema, encoding="utf-8") as f:
+            content = f.read()
+
+        compile(content, schema, "exec")
+        self.assertIn("class aaron:", content)
 
     def test_002_create_config(self):
         from cfg4py.resources.schema import Config
@@ -293,6 +297,378 @@ class TestCfg4Py(unittest.TestCase):
         self.assertTrue(getattr(cfg, "logging", None))
         self.assertTrue(cfg.logging.get("handlers"))        
 
+    def test_015_fast_mode(self):
+        from cfg4py.nodes import FastConfig
+
+        cfg = cfg4py.init(self.resource_path, fast=True)
+        self.assertIsInstance(cfg.services, FastConfig)
+        self.assertEqual(cfg.services.redis.host, "127.0.0.1")
+        self.assertEqual(0, cfg.services.__access_counter__)
+
+        # switching back keeps the same root object and restores the counter
+        cfg2 = cfg4py.init(self.resource_path)
+        self.assertIs(cfg, cfg2)
+        self.assertEqual(cfg2.services.redis.host, "127.0.0.1")
+        self.assertTrue(cfg2.services.__access_counter__ > 0)
+
+    def test_016_change_listener(self):
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        cfg4py.init(self.resource_path)
+
+        redis_changes = []
+        all_changes = []
+        cfg4py.add_change_listener("services.redis", redis_changes.append)
+        cfg4py.add_change_listener("", all_changes.append)
+
+        try:
+            cfg4py.update_config({"services": {"redis": {"host": "127.0.0.1"}}})
+            self.assertEqual(0, len(redis_changes))
+            self.assertEqual(0, len(all_changes))
+
+            cfg4py.update_config({"foo": "baz"})
+            self.assertEqual(0, len(redis_changes))
+            self.assertEqual(["foo"], all_changes[-1].modified)
+
+            cfg4py.update_config({"services": {"redis": {"host": "localhost"}}})
+            self.assertEqual(["services.redis.host"], redis_changes[-1].modified)
+        finally:
+            cfg4py.remove_change_listener("services.redis", redis_changes.append)
+            cfg4py.remove_change_listener("", all_changes.append)
+
+    def test_016_update_changed_in_place(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        conf = {"services": {"redis": {"host": "localhost"}}}
+        cfg4py.update_config(conf)
+
+        changes = []
+        host = cfg4py.getter("services.redis.host")
+        cfg4py.add_change_listener("services.redis", changes.append)
+        try:
+            conf["services"]["redis"]["host"] = "h"
+            self.assertEqual("localhost", cfg.services.redis.host)
+
+            cfg4py.update_config(conf)
+            self.assertEqual("h", cfg.services.redis.host)
+            self.assertEqual("h", host())
+            self.assertEqual(["services.redis.host"], changes[-1].modified)
+        finally:
+            cfg4py.remove_change_listener("services.redis", changes.append)
+
+    def test_016_diff_on_demand(self):
+        cfg4py.init(self.resource_path, dump_on_change=False)
+        changes = []
+        cfg4py.add_change_listener("services.redis", changes.append)
+        try:
+            with mock.patch("cfg4py.core.diff", wraps=core.diff) as spy:
+                # no listener is concerned
+                cfg4py.update_config({"foo": "changed"})
+                spy.assert_not_called()
+
+                cfg4py.update_config({"services": {"redis": {"host": "h"}}})
+                spy.assert_called_once()
+
+            self.assertEqual(["services.redis.host"], changes[-1].modified)
+        finally:
+            cfg4py.remove_change_listener("services.redis", changes.append)
+
+    def test_016_update_under_lock(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+
+        # a refresh in progress in another thread
+        held, release = threading.Event(), threading.Event()
+
+        def refresh():
+            with core._refresh_lock:
+                held.set()
+                release.wait(5)
+                cfg4py.update_config({"foo": "refreshed"})
+
+        thread = threading.Thread(target=refresh)
+        thread.start()
+        held.wait(5)
+        try:
+            updater = threading.Thread(
+                target=cfg4py.update_config, args=({"foo": "updated"},)
+            )
+            updater.start()
+            updater.join(0.1)
+            self.assertTrue(updater.is_alive())
+        finally:
+            release.set()
+            thread.join()
+            updater.join()
+
+        self.assertEqual("updated", cfg.foo)
+
+        # listeners may update the configuration as well
+        def listener(changes):
+            cfg4py.update_config({"bar": cfg.foo})
+
+        cfg4py.add_change_listener("foo", listener)
+        try:
+            cfg4py.update_config({"foo": "again"})
+            self.assertEqual("again", cfg.bar)
+        finally:
+            cfg4py.remove_change_listener("foo", listener)
+
+    def test_017_refresh_unchanged(self):
+        class Fetcher(cfg4py.RemoteConfigFetcher):
+            def fetch(self):
+                return {"services": {"redis2": {"host": "192.168.3.2"}}}
+
+        cfg = cfg4py.init(self.resource_path)
+        core._remote_fetcher = Fetcher()
+        core._backoff.reset()
+        core._refresh()
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+
+        try:
+            with mock.patch("cfg4py.core._apply") as update:
+                core._refresh()
+                update.assert_not_called()
+        finally:
+            core._remote_fetcher = None
+
+    def test_018_lazy_import(self):
+        import subprocess
+
+        code = (
+            "import sys, cfg4py;"
+            "heavy = ('apscheduler', 'watchdog', 'ruamel', 'yaml', 'msgpack',"
+            "'asyncio', 'fire');"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in heavy))"
+        )
+        env = dict(os.environ, PYTHONPATH=self.home)
+        output = subprocess.check_output([sys.executable, "-c", code], env=env)
+        self.assertEqual("[]", output.decode().strip())
+
+    def test_019_hot_reload(self):
+        cfg4dir = os.path.join(self.output, "hot_reload")
+        os.makedirs(cfg4dir, exist_ok=True)
+        config_file = os.path.join(cfg4dir, "defaults.yaml")
+        with open(config_file, "w") as f:
+            f.write("account: aaron\n")
+
+        cfg = cfg4py.init(cfg4dir)
+        self.assertEqual("aaron", cfg.account)
+
+        # a burst of writes is applied once
+        with mock.patch("cfg4py.core._apply", wraps=core._apply) as update:
+            for name in ["a", "b", "c"]:
+                with open(config_file, "w") as f:
+                    f.write(f"account: {name}\n")
+                time.sleep(0.05)
+
+            time.sleep(1.5)
+            self.assertEqual("c", cfg.account)
+            self.assertEqual(1, update.call_count)
+
+        with mock.patch("cfg4py.core._load_from_local_file") as load:
+            # touching the file is a no-op
+            os.utime(config_file)
+            time.sleep(1.5)
+            load.assert_not_called()
+
+            # files not in use are ignored
+            handler = core.LocalConfigChangeHandler(delay=0)
+            event = mock.Mock(
+                event_type="modified",
+                is_directory=False,
+                src_path=os.path.join(cfg4dir, "production.yaml"),
+                dest_path="",
+            )
+            handler.dispatch(event)
+            self.assertIsNone(handler._timer)
+
+    def test_019_reload_broken(self):
+        cfg4dir = os.path.join(self.output, "reload_broken")
+        os.makedirs(cfg4dir, exist_ok=True)
+        config_file = os.path.join(cfg4dir, "defaults.yaml")
+        with open(config_file, "w") as f:
+            f.write("account: aaron\n")
+
+        cfg = cfg4py.init(cfg4dir, dump_on_change=False)
+        digest = core._local_digest
+
+        # a broken edit keeps the configuration in effect, and is retried
+        with open(config_file, "w") as f:
+            f.write("account: [aaron\n")
+        with self.assertLogs("cfg4py.core", logging.ERROR):
+            core._reload_local()
+
+        self.assertEqual("aaron", cfg.account)
+        self.assertEqual({"account": "aaron"}, core._cfg_local)
+        self.assertEqual(digest, core._local_digest)
+
+        with open(config_file, "w") as f:
+            f.write("account: bob\n")
+        core._reload_local()
+        self.assertEqual("bob", cfg.account)
+
+    def test_020_dump_diff(self):
+        cfg4py.init(self.resource_path, dump_on_change="diff")
+
+        with self.assertLogs("cfg4py.core", level="INFO") as logs:
+            cfg4py.update_config({"db": {"password": "secret", "host": "localhost"}})
+
+        self.assertIn("+ db = {'password': '******', 'host': 'localhost'}", logs.output[0])
+
+        # nothing is rendered if the record is filtered out
+        core_logger = logging.getLogger("cfg4py.core")
+        level = core_logger.level
+        core_logger.setLevel(logging.WARNING)
+        try:
+            with mock.patch("cfg4py.core.ChangeLog.__str__") as render:
+                cfg4py.update_config({"db": {"host": "127.0.0.1"}})
+                render.assert_not_called()
+        finally:
+            core_logger.setLevel(level)
+
+    def test_021_incremental_logging(self):
+        import copy
+        import logging.config
+
+        cfg = cfg4py.init(self.resource_path)
+        logconf = copy.deepcopy(cfg.logging)
+        handlers = list(logging.getLogger().handlers)
+
+        with mock.patch(
+            "logging.config.dictConfig", wraps=logging.config.dictConfig
+        ) as dict_config:
+            # unchanged
+            cfg4py.update_config({"logging": copy.deepcopy(logconf), "foo": "bar"})
+            dict_config.assert_not_called()
+
+            # level changed only, handlers are kept
+            logconf["root"]["level"] = "WARNING"
+            logconf["handlers"]["console"]["level"] = "ERROR"
+            cfg4py.update_config({"logging": copy.deepcopy(logconf)})
+            applied = dict_config.call_args[0][0]
+            self.assertTrue(applied["incremental"])
+            self.assertEqual(logging.WARNING, logging.getLogger().level)
+            self.assertEqual(handlers, logging.getLogger().handlers)
+            self.assertEqual(logging.ERROR, handlers[0].level)
+
+            # other settings changed
+            logconf["formatters"]["simple"]["format"] = "%(message)s"
+            cfg4py.update_config({"logging": copy.deepcopy(logconf)})
+            self.assertNotIn("incremental", dict_config.call_args[0][0])
+
+    def test_022_cascade(self):
+        import socket
+
+        cfg4dir = os.path.join(self.output, "cascade")
+        os.makedirs(cfg4dir, exist_ok=True)
+        files = {
+            "defaults.yaml": "a: defaults\nb: defaults\nc: defaults\nd: defaults\n",
+            "eu.yaml": "b: eu\nc: eu\nd: eu\n",
+            "staging.json": '{"c": "staging", "d": "staging"}',
+            f"{socket.gethostname()}.yaml": "d: host\n",
+        }
+        for name, content in files.items():
+            with open(os.path.join(cfg4dir, name), "w") as f:
+                f.write(content)
+
+        os.environ["__cfg4py_server_role__"] = "STAGING"
+        os.environ["CFG4PY_REGION"] = "eu"
+        cascade = ["defaults", "{env[CFG4PY_REGION]}", "{role}", "{hostname}"]
+        try:
+            cfg = cfg4py.init(cfg4dir, dump_on_change=False, cascade=cascade)
+            self.assertEqual(
+                ["defaults", "eu", "staging", "host"], [cfg.a, cfg.b, cfg.c, cfg.d]
+            )
+
+            # the dir is listed once, until the watcher sees files created or deleted
+            with mock.patch("os.listdir", side_effect=AssertionError):
+                core._load_from_local_file()
+
+            handler = core.LocalConfigChangeHandler(delay=60)
+            event = mock.Mock(
+                event_type="created",
+                is_directory=False,
+                src_path=os.path.join(cfg4dir, "eu.toml"),
+                dest_path="",
+            )
+            handler.dispatch(event)
+            handler._timer.cancel()
+            self.assertIsNone(core._local_index)
+
+            # missing layers are skipped
+            del os.environ["CFG4PY_REGION"]
+            self.assertEqual("defaults", core._load_from_local_file()["b"])
+        finally:
+            core._local_observer.stop()
+            os.environ.pop("CFG4PY_REGION", None)
+            cfg4py.init(self.resource_path, dump_on_change=False)
+
+    def test_023_getter(self):
+        for snapshot in (False, True):
+            cfg4py.init(self.resource_path, dump_on_change=False, snapshot=snapshot)
+            cfg4py.update_config({"services": {"redis": {"host": "localhost"}}})
+
+            host = cfg4py.getter("services.redis.host")
+            missing = cfg4py.getter("services.redis.port", 6379)
+            section = cfg4py.getter("services.redis")
+            self.assertEqual("localhost", host())
+            self.assertEqual(6379, missing())
+            self.assertEqual("localhost", section().host)
+
+            # still valid after updates
+            cfg4py.update_config({"services": {"redis": {"host": "h", "port": 1}}})
+            self.assertEqual("h", host())
+            self.assertEqual(1, missing())
+
+        cfg4py.init(self.resource_path, dump_on_change=False)
+
+    def test_023_index_on_first_use(self):
+        from cfg4py.index import FlatIndex
+
+        cfg4py.init(self.resource_path, dump_on_change=False)
+        with mock.patch.object(core, "_index", FlatIndex(deferred=True)):
+            cfg4py.update_config({"services": {"redis": {"host": "h"}}})
+            index = cfg4py.get_index()
+            self.assertTrue(index.deferred)
+            self.assertEqual({"services.redis.host": "h"}, index.query("*.redis.host"))
+            self.assertFalse(index.deferred)
+
+            # then it's kept up to date
+            cfg4py.update_config({"services": {"redis": {"host": "h2"}}})
+            self.assertFalse(index.deferred)
+            self.assertEqual("h2", cfg4py.getter("services.redis.host")())
+
+    def test_024_lazy_mode(self):
+        from cfg4py.nodes import LazyConfig
+
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False, lazy=True)
+        self.assertIsInstance(cfg, LazyConfig)
+
+        # nothing is built until it's read
+        self.assertNotIn("services", cfg.__dict__)
+        self.assertEqual("127.0.0.1", cfg.services.redis.host)
+        self.assertIn("services", cfg.__dict__)
+        self.assertNotIn("tz", cfg.__dict__)
+        self.assertIn("tz", dir(cfg))
+        self.assertIsNone(getattr(cfg, "missing", None))
+        self.assertTrue(cfg.logging.get("handlers"))
+
+        # unchanged sections are kept, changed ones are built again
+        services = cfg.services
+        cfg4py.update_config({"tz": "UTC"})
+        self.assertIs(services, cfg.services)
+        self.assertEqual("UTC", cfg.tz)
+
+        cfg4py.update_config({"services": {"redis": {"host": "localhost"}}})
+        self.assertIsNot(services, cfg.services)
+        self.assertEqual("localhost", cfg.services.redis.host)
+        self.assertEqual("127.0.0.1", services.redis.host)
+
+        # schema is built from all sections, read or not
+        lines = core._schema_from_obj_(cfg, [])
+        self.assertIn("    tz: Optional[str] = None\n", lines)
+
+        cfg4py.init(self.resource_path, dump_on_change=False)
+        self.assertEqual("127.0.0.1", cfg.services.redis.host)
+
     @mock.patch("builtins.print")
     def test_version(self, mocked_print):
         cmd = Command()
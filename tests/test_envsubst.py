@@ -0,0 +1,78 @@
+"""Tests for environment variable substitution."""
+import unittest
+from unittest import mock
+
+from cfg4py import loaders
+from cfg4py.core import _load_and_replace_envar
+from cfg4py.envsubst import EnvarNotSetError, compile_template
+
+
+class TestEnvSubst(unittest.TestCase):
+    def render(self, content: str, **environ):
+        return compile_template(content, loaders.get("yaml").load).render(environ)
+
+    def test_substitute(self):
+        content = "\n".join(
+            [
+                "dsn: postgres://${USER}:${PASSWORD}@${HOST:-localhost}/db",
+                "redis:",
+                "  port: ${PORT}",
+                "  ratio: ${RATIO}",
+                "  debug: ${DEBUG:-false}",
+                "  name: ${NAME}",
+                "  tags: ['${TAG:-a}', b]",
+                "${KEY}: value",
+            ]
+        )
+        conf = self.render(
+            content,
+            USER="aaron",
+            PASSWORD="p:w",
+            PORT="6379",
+            RATIO="0.5",
+            NAME="- x",
+            KEY="k",
+        )
+
+        self.assertEqual("postgres://aaron:p:w@localhost/db", conf["dsn"])
+        self.assertEqual(6379, conf["redis"]["port"])
+        self.assertEqual(0.5, conf["redis"]["ratio"])
+        self.assertIs(False, conf["redis"]["debug"])
+        # values are not parsed as yaml again
+        self.assertEqual("- x", conf["redis"]["name"])
+        self.assertEqual(["a", "b"], conf["redis"]["tags"])
+        self.assertEqual("value", conf["k"])
+
+    def test_not_set(self):
+        with self.assertRaises(EnvarNotSetError) as cm:
+            self.render("a: ${A}\nb: ${B}-${C:-}\n", C="c")
+
+        self.assertEqual(["A", "B"], cm.exception.names)
+
+        # empty default is allowed, and gives an empty string, not null
+        self.assertEqual({"a": "", "b": "x-"}, self.render("a: ${A:-}\nb: x-${B:-}"))
+        self.assertEqual({"a": ""}, self.render("a: ${A}", A=""))
+        self.assertEqual({"a": None}, self.render("a: ${A:-null}"))
+
+    def test_compiled_once(self):
+        content = "host: ${HOST}\nport: 6379\n"
+        envars = set()
+
+        with mock.patch.dict("os.environ", {"HOST": "h1"}):
+            first = _load_and_replace_envar(content, envars)
+
+        self.assertEqual({"HOST"}, envars)
+
+        load = mock.Mock(side_effect=AssertionError)
+        with mock.patch("cfg4py.loaders._yaml_load", load):
+            with mock.patch.dict("os.environ", {"HOST": "h2"}):
+                second = _load_and_replace_envar(content)
+
+        load.assert_not_called()
+
+        self.assertEqual({"host": "h1", "port": 6379}, first)
+        self.assertEqual({"host": "h2", "port": 6379}, second)
+
+        # results don't share state with the cached template
+        second["port"] = 1
+        self.assertEqual(6379, self.render(content, HOST="h")["port"])
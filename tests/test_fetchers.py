@@ -0,0 +1,239 @@
+"""Tests for file and http fetchers, and failure handling of refreshes."""
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import cfg4py
+from cfg4py import core, metrics
+from cfg4py.backoff import Backoff, Deadline
+from cfg4py.fetchers import ConnectionPool, FileConfigFetcher, HTTPConfigFetcher
+
+
+class ConfigServer(ThreadingHTTPServer):
+    """A stand-in of the config server, which serves `content` at any path"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ConfigHandler)
+        self.content = b"{}"
+        self.status = 200
+        self.delay = 0
+        self.connections = 0
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/app/config"
+
+    def publish(self, conf: dict):
+        self.content = json.dumps(conf).encode("utf-8")
+
+    def handle_error(self, request, client_address):
+        # clients which timed out close connections
+        pass
+
+
+class ConfigHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, body: bool):
+        server = self.server
+        server.requests.append(self.command)
+        time.sleep(server.delay)
+
+        etag = f'"{hash(server.content)}"'
+        if server.status != 200:
+            self.send_response(server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(server.content)))
+        self.end_headers()
+        if body:
+            self.wfile.write(server.content)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+
+class TestBackoff(unittest.TestCase):
+    def test_delays(self):
+        backoff = Backoff(base=1, cap=10, rand=random.Random(78))
+        self.assertTrue(backoff.ready())
+
+        for ceiling in (1, 2, 4, 8, 10, 10):
+            delay = backoff.failed()
+            self.assertTrue(0 <= delay <= ceiling, (delay, ceiling))
+
+        self.assertEqual(6, backoff.failures)
+        backoff.reset()
+        self.assertTrue(backoff.ready())
+        self.assertEqual(0, backoff.failures)
+
+    def test_deadline(self):
+        deadline = Deadline(0.05)
+        self.assertGreater(deadline.remaining(), 0)
+        time.sleep(0.06)
+        with self.assertRaises(TimeoutError):
+            deadline.remaining()
+
+
+class TestFetchers(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff.reset()
+        metrics.reset()
+
+        self.server = ConfigServer()
+        self.server.publish({"services": {"redis2": {"host": "192.168.3.2"}}})
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+
+        self.pool = ConnectionPool()
+        self.fetcher = HTTPConfigFetcher(self.server.url, connections=self.pool)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+        core._remote_fetcher = None
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff = Backoff()
+        if core._local_observer is not None:
+            core._local_observer.stop()
+            core._local_observer = None
+
+    def test_http(self):
+        version = self.fetcher.version()
+        self.assertIsNotNone(version)
+        self.assertEqual(
+            {"services": {"redis2": {"host": "192.168.3.2"}}}, self.fetcher.fetch()
+        )
+
+        # not modified, served from the last fetch
+        conf = self.fetcher.fetch()
+        self.assertEqual("192.168.3.2", conf["services"]["redis2"]["host"])
+        self.assertEqual(version, self.fetcher.version())
+
+        self.server.publish({"tz": "UTC"})
+        self.assertNotEqual(version, self.fetcher.version())
+        self.assertEqual({"tz": "UTC"}, self.fetcher.fetch())
+
+        self.assertEqual(
+            ["HEAD", "GET", "GET", "HEAD", "HEAD", "GET"], self.server.requests
+        )
+        # all requests are sent over one keep-alive connection
+        self.assertEqual(1, self.server.connections)
+
+    def test_stale_connection(self):
+        self.fetcher.fetch()
+        # the server closes idle connections
+        for idle in self.pool._idle.values():
+            for conn in idle:
+                conn.sock.shutdown(2)
+
+        self.server.publish({"tz": "UTC"})
+        self.assertEqual({"tz": "UTC"}, self.fetcher.fetch())
+        self.assertEqual(2, self.server.connections)
+
+    def test_timeout(self):
+        self.server.delay = 0.5
+        fetcher = HTTPConfigFetcher(self.server.url, timeout=0.2, connections=self.pool)
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            fetcher.fetch()
+        self.assertLess(time.monotonic() - start, 0.45)
+
+    def test_keep_last_known_good(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        core._remote_fetcher = self.fetcher
+        core._backoff = Backoff(base=10, cap=10)
+
+        core._refresh()
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+
+        self.server.status = 500
+        self.server.publish({"services": {"redis2": {"host": "192.168.3.3"}}})
+        core._refresh()
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+        self.assertEqual(1, metrics.snapshot()["refreshes"]["failure"])
+
+        # backing off, the server is not bothered
+        with mock.patch.object(self.fetcher, "version") as version:
+            core._refresh()
+            version.assert_not_called()
+
+        self.server.status = 200
+        core._backoff.reset()
+        core._refresh()
+        self.assertEqual("192.168.3.3", cfg.services.redis2.host)
+        self.assertEqual(0, core._backoff.failures)
+
+    def test_empty_is_failure(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        core._remote_fetcher = self.fetcher
+        core._refresh()
+
+        self.server.publish({})
+        core._refresh()
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+        self.assertIn("FetchError", metrics.snapshot()["last_error"])
+
+    def test_file(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+
+        path = os.path.join(root, "remote.json")
+        with open(path, "w") as f:
+            json.dump({"tz": "UTC"}, f)
+
+        fetcher = FileConfigFetcher(path)
+        version = fetcher.version()
+        self.assertEqual({"tz": "UTC"}, fetcher.fetch())
+
+        with open(path, "w") as f:
+            json.dump({"tz": "Asia/Shanghai"}, f)
+        os.utime(path, ns=(0, 0))
+
+        self.assertNotEqual(version, fetcher.version())
+        self.assertEqual({"tz": "Asia/Shanghai"}, fetcher.fetch())
+
+        with self.assertRaises(ValueError):
+            FileConfigFetcher(os.path.join(root, "remote.ini"))
@@ -0,0 +1,116 @@
+"""Tests for the flattened index of configuration."""
+import random
+import unittest
+
+from cfg4py.diff import diff
+from cfg4py.index import FlatIndex, flatten
+
+
+class TestFlatIndex(unittest.TestCase):
+    def setUp(self):
+        self.conf = {
+            "services": {
+                "redis": {"host": "r", "port": 6379},
+                "postgres": {"host": "pg", "pool": {"min": 1}},
+            },
+            "debug": True,
+            "tags": ["a", "b"],
+            "empty": {},
+        }
+        self.index = FlatIndex()
+        self.index.update(diff({}, self.conf), self.conf)
+
+    def test_flatten(self):
+        self.assertEqual(
+            {
+                "services.redis.host": "r",
+                "services.redis.port": 6379,
+                "services.postgres.host": "pg",
+                "services.postgres.pool.min": 1,
+                "debug": True,
+                "tags": ["a", "b"],
+            },
+            flatten(self.conf),
+        )
+        self.assertEqual(flatten(self.conf), self.index.to_dict())
+
+    def test_query(self):
+        self.assertEqual(
+            {"services.redis.host": "r", "services.postgres.host": "pg"},
+            self.index.query("services.*.host"),
+        )
+        self.assertEqual(
+            {"services.postgres.pool.min": 1}, self.index.query("**.min")
+        )
+        self.assertEqual(
+            {"services.redis.host": "r", "services.redis.port": 6379},
+            self.index.query("services.redis"),
+        )
+        self.assertEqual({"debug": True}, self.index.query("debug"))
+        # prefix matches whole segments only
+        self.assertEqual({}, self.index.query("services.red"))
+        self.assertEqual(2, len(self.index.query("services.re?is.*")))
+
+    def test_to_env(self):
+        env = self.index.to_env("services.redis", env_prefix="app_")
+        self.assertEqual(
+            {"APP_SERVICES_REDIS_HOST": "r", "APP_SERVICES_REDIS_PORT": "6379"}, env
+        )
+
+        env = self.index.to_env()
+        self.assertEqual("true", env["DEBUG"])
+        self.assertEqual('["a", "b"]', env["TAGS"])
+
+    def test_incremental(self):
+        rand = random.Random(78)
+        conf = self.conf
+        for _ in range(200):
+            new = {
+                f"k{i}": rand.choice(
+                    [i, {"a": rand.randint(0, 2)}, {"b": {"c": i}}, {}, [i]]
+                )
+                for i in range(rand.randint(0, 8))
+            }
+            self.index.update(diff(conf, new), new)
+            conf = new
+
+            self.assertEqual(flatten(conf), self.index.to_dict())
+            self.assertEqual(sorted(flatten(conf)), self.index.paths())
+
+    def test_bulk(self):
+        conf = {f"s{i}": {f"k{j}": i * 20 + j for j in range(20)} for i in range(20)}
+        self.index.rebuild(conf)
+        # a few, many and all of the leaves are changed
+        for step in (97, 5, 1):
+            new = {
+                section: {k: v + 1 if v % step == 0 else v for k, v in entries.items()}
+                for section, entries in conf.items()
+            }
+            new.pop(next(iter(new)))
+            new[f"new{step}"] = {"a": step}
+            self.index.update(diff(conf, new), new)
+            conf = new
+
+            self.assertEqual(flatten(conf), self.index.to_dict())
+            self.assertEqual(sorted(flatten(conf)), self.index.paths())
+
+    def test_defer(self):
+        index = FlatIndex(deferred=True)
+        self.assertTrue(index.deferred)
+        self.assertEqual(0, len(index))
+        self.assertFalse(index.deferred)
+
+        self.index.defer({"a": 1})
+        self.assertTrue(self.index.deferred)
+        self.assertEqual({}, self.index.data)
+
+        # updates only remember the configuration till the first read
+        new = {"a": 2, "b": {"c": 3}}
+        self.index.update(diff({"a": 1}, new), new)
+        self.assertTrue(self.index.deferred)
+        self.assertEqual(2, self.index.get("a"))
+        self.assertFalse(self.index.deferred)
+        self.assertEqual(["a", "b.c"], self.index.paths())
+
+        self.index.defer(self.conf)
+        self.assertEqual(flatten(self.conf), self.index.to_dict())
@@ -0,0 +1,100 @@
+"""Tests for loaders of config files and remote content."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fakeredis
+import msgpack
+
+import cfg4py
+from cfg4py import core, loaders
+
+CONF = {"account": "${cfg4py_account}", "redis": {"port": 6379, "hosts": ["a", "b"]}}
+
+
+class TestLoaders(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        os.environ["cfg4py_account"] = "aaron"
+        self.config_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+        loaders._yaml_backend = loaders._yaml_load = None
+
+    def write(self, name: str, content):
+        mode = "wb" if isinstance(content, bytes) else "w"
+        with open(os.path.join(self.config_dir, name), mode) as f:
+            f.write(content)
+
+    def assert_loaded(self, host: str):
+        cfg = cfg4py.init(self.config_dir, dump_on_change=False)
+        core._local_observer.stop()
+
+        self.assertEqual("aaron", cfg.account)
+        self.assertEqual(6379, cfg.redis.port)
+        self.assertEqual(["a", "b"], cfg.redis.hosts)
+        self.assertEqual(host, cfg.host)
+
+    def test_lookup(self):
+        self.assertEqual("json", loaders.for_extension(".JSON").name)
+        self.assertIsNone(loaders.for_extension(".ini"))
+
+        loader = loaders.for_content_type("application/x-yaml; charset=utf-8")
+        self.assertEqual("yaml", loader.name)
+        self.assertTrue(loaders.for_content_type("application/msgpack").binary)
+
+        with self.assertRaises(ValueError):
+            loaders.for_content_type("text/html")
+
+        self.assertIn(".toml", loaders.extensions())
+
+    def test_json(self):
+        self.write("defaults.json", json.dumps(CONF))
+        self.write("test.json", '{"host": "127.0.0.1"}')
+        self.assert_loaded("127.0.0.1")
+
+    def test_toml(self):
+        self.write(
+            "defaults.toml",
+            'account = "${cfg4py_account}"\n[redis]\nport = 6379\nhosts = ["a", "b"]\n',
+        )
+        self.write("test.toml", 'host = "127.0.0.2"\n')
+        self.assert_loaded("127.0.0.2")
+
+    def test_msgpack(self):
+        self.write("defaults.msgpack", msgpack.packb(CONF))
+        self.write("test.msgpack", msgpack.packb({"host": "127.0.0.3"}))
+        self.assert_loaded("127.0.0.3")
+
+    def test_yaml_backends(self):
+        content = "a: 1\nb: [x, {c: 2.5}]\n"
+        for backend in ("ruamel", "pyyaml-c"):
+            loaders.set_yaml_backend(backend)
+            self.assertEqual(backend, loaders.yaml_backend())
+            self.assertEqual(
+                {"a": 1, "b": ["x", {"c": 2.5}]}, loaders.get("yaml").load(content)
+            )
+
+        with self.assertRaises(ValueError):
+            loaders.set_yaml_backend("libfoo")
+
+        # ruamel.yaml is the default even if PyYAML is installed, yaml 1.2 is kept
+        loaders._yaml_backend = loaders._yaml_load = None
+        self.assertIn(loaders.yaml_backend(), ("ruamel-c", "ruamel"))
+        self.assertEqual({"a": "yes"}, loaders.get("yaml").load("a: yes\n"))
+
+    def test_remote_content_type(self):
+        server = fakeredis.FakeServer()
+        with mock.patch("redis.StrictRedis", fakeredis.FakeStrictRedis):
+            fetcher = cfg4py.RedisConfigFetcher(
+                "my_app_config", content_type="application/msgpack", server=server
+            )
+            fetcher.publish(msgpack.packb(CONF))
+
+            conf = fetcher.fetch()
+            self.assertEqual("aaron", conf["account"])
+            self.assertEqual(6379, conf["redis"]["port"])
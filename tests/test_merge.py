@@ -0,0 +1,120 @@
+"""Tests for the merge engine."""
+import copy
+import unittest
+
+from cfg4py import core
+from cfg4py.merge import merge
+
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.base = {
+            "services": {
+                "redis": {"host": "localhost", "port": 6379},
+                "postgres": {"dsn": "postgres://localhost/db"},
+            },
+            "hosts": ["a", "b"],
+            "tz": "UTC",
+        }
+        self.override = {
+            "services": {"redis": {"host": "127.0.0.1"}, "mq": {"host": "mq"}},
+            "hosts": ["c"],
+        }
+
+    def test_merge(self):
+        base, override = copy.deepcopy(self.base), copy.deepcopy(self.override)
+        merged = merge(self.base, self.override)
+
+        self.assertEqual(
+            {
+                "services": {
+                    "redis": {"host": "127.0.0.1", "port": 6379},
+                    "postgres": {"dsn": "postgres://localhost/db"},
+                    "mq": {"host": "mq"},
+                },
+                "hosts": ["c"],
+                "tz": "UTC",
+            },
+            merged,
+        )
+
+        # neither input is changed
+        self.assertEqual(base, self.base)
+        self.assertEqual(override, self.override)
+
+    def test_structural_sharing(self):
+        merged = merge(self.base, self.override)
+
+        # untouched sections come from base, new ones from override
+        self.assertIs(self.base["services"]["postgres"], merged["services"]["postgres"])
+        self.assertIs(self.override["services"]["mq"], merged["services"]["mq"])
+        self.assertIsNot(self.base["services"], merged["services"])
+
+        # nothing changed
+        self.assertIs(self.base, merge(self.base, {}))
+        self.assertIs(self.base, merge(self.base, {"services": {"redis": {}}}))
+        self.assertIs(self.override, merge({}, self.override))
+
+    def test_type_changed(self):
+        # a section over a list or a scalar replaces it, and vice versa
+        merged = merge(
+            {"a": [1, 2], "b": 1, "c": {"d": 1}}, {"a": {"x": 1}, "b": {}, "c": 2}
+        )
+        self.assertEqual({"a": {"x": 1}, "b": {}, "c": 2}, merged)
+
+    def test_lists(self):
+        self.assertEqual(
+            ["a", "b", "c"], merge(self.base, self.override, "append")["hosts"]
+        )
+
+        base = {
+            "plugins": [
+                {"name": "auth", "enabled": True, "options": {"ttl": 60}},
+                {"name": "cache", "enabled": True},
+                "raw",
+            ]
+        }
+        override = {
+            "plugins": [
+                {"name": "auth", "options": {"ttl": 30}},
+                {"name": "metrics", "enabled": False},
+            ]
+        }
+        merged = merge(base, override, "key:name")
+        self.assertEqual(
+            [
+                {"name": "auth", "enabled": True, "options": {"ttl": 30}},
+                {"name": "cache", "enabled": True},
+                "raw",
+                {"name": "metrics", "enabled": False},
+            ],
+            merged["plugins"],
+        )
+        self.assertIs(base["plugins"][1], merged["plugins"][1])
+        self.assertEqual(60, base["plugins"][0]["options"]["ttl"])
+
+        # by path, the first matched pattern wins, others are replaced
+        lists = {"services.*.hosts": "append", "plugins": "key:name"}
+        merged = merge(
+            {"services": {"redis": {"hosts": ["a"]}}, "hosts": ["a"]},
+            {"services": {"redis": {"hosts": ["b"]}}, "hosts": ["b"]},
+            lists,
+        )
+        self.assertEqual(["a", "b"], merged["services"]["redis"]["hosts"])
+        self.assertEqual(["b"], merged["hosts"])
+
+        with self.assertRaises(ValueError):
+            merge(self.base, self.override, "prepend")
+
+    def test_remote_not_changed(self):
+        core._cfg_remote = self.base
+        core._cfg_local = self.override
+        try:
+            merged = core._merge_remote_local()
+            merged = core._merge_remote_local()
+        finally:
+            core._cfg_remote, core._cfg_local = {}, {}
+
+        self.assertEqual("127.0.0.1", merged["services"]["redis"]["host"])
+        self.assertEqual("localhost", self.base["services"]["redis"]["host"])
+        self.assertNotIn("mq", self.base["services"])
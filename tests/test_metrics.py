@@ -0,0 +1,122 @@
+"""Tests for refresh metrics and hooks."""
+import json
+import os
+import unittest
+
+import cfg4py
+from cfg4py import core, loaders, metrics
+from cfg4py.diff import content_hash
+
+
+class MemoryFetcher(cfg4py.RemoteConfigFetcher):
+    def __init__(self):
+        self.content = None
+        self.error = None
+        self._version = 0
+
+    def publish(self, conf: dict):
+        self.content = json.dumps(conf)
+        self._version += 1
+
+    def version(self):
+        return str(self._version)
+
+    def fetch(self) -> dict:
+        if self.error is not None:
+            raise self.error
+
+        return core._load_and_replace_envar(self.content, loader=loaders.get("json"))
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff.reset()
+
+        self.fetcher = MemoryFetcher()
+        cfg4py.init(self.resource_path, dump_on_change=False)
+        core._remote_fetcher = self.fetcher
+
+        metrics.reset()
+        self.events = []
+        metrics.add_hook(self.hook)
+
+    def tearDown(self):
+        metrics.remove_hook(self.hook)
+        metrics.reset()
+        core._remote_fetcher = None
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff.reset()
+        if core._local_observer is not None:
+            core._local_observer.stop()
+            core._local_observer = None
+
+    def hook(self, name, value):
+        self.events.append(name)
+
+    def test_refresh(self):
+        self.assertIsNone(metrics.staleness())
+        self.fetcher.publish({"services": {"redis2": {"host": "h"}}})
+        core._refresh()
+        core._refresh()
+
+        self.fetcher.publish({"services": {"redis2": {"host": "h"}}})
+        core._refresh()
+
+        self.fetcher.error = ConnectionError("down")
+        self.fetcher.publish({})
+        core._refresh()
+
+        stat = metrics.snapshot()
+        self.assertEqual({"success": 1, "noop": 2, "failure": 1}, stat["refreshes"])
+        self.assertIn("ConnectionError", stat["last_error"])
+        self.assertEqual("2", stat["version"])
+        self.assertEqual(content_hash(core._cfg_current), stat["digest"])
+        self.assertLess(stat["staleness"], 5)
+
+        for stage in ("fetch", "parse", "envsubst", "merge", "apply"):
+            self.assertGreater(stat["stages"][stage]["count"], 0, stage)
+            self.assertIn(stage, self.events)
+
+        self.assertEqual(4, stat["stages"]["fetch"]["count"])
+        self.assertEqual(1, stat["stages"]["merge"]["count"])
+        self.assertEqual(1, self.events.count("refresh.success"))
+        self.assertEqual(1, self.events.count("refresh.failure"))
+
+    def test_disabled(self):
+        metrics.remove_hook(self.hook)
+        self.assertIs(metrics._null, metrics.timer("fetch"))
+
+        self.fetcher.publish({"services": {"redis2": {"host": "h"}}})
+        core._refresh()
+
+        stat = metrics.snapshot()
+        self.assertEqual({}, stat["stages"])
+        self.assertEqual(1, stat["refreshes"]["success"])
+
+        metrics.enable()
+        try:
+            self.assertIsNot(metrics._null, metrics.timer("fetch"))
+        finally:
+            metrics.enable(False)
+
+    def test_broken_hook(self):
+        def broken(name, value):
+            raise RuntimeError("broken")
+
+        metrics.add_hook(broken)
+        try:
+            self.fetcher.publish({"services": {"redis2": {"host": "h"}}})
+            with self.assertLogs("cfg4py.metrics", level="WARNING"):
+                core._refresh()
+        finally:
+            metrics.remove_hook(broken)
+
+        self.assertIn("refresh.success", self.events)
+        self.assertEqual("h", cfg4py.get_instance().services.redis2.host)
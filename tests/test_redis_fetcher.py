@@ -0,0 +1,217 @@
+"""Tests for `RedisConfigFetcher`, against a fake redis server."""
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+import fakeredis
+
+import cfg4py
+from cfg4py import core
+
+
+def wait_until(predicate, timeout: float = 5):
+    end = time.time() + timeout
+    while time.time() < end:
+        if predicate():
+            return True
+        time.sleep(0.05)
+
+    return False
+
+
+def remove_jobs():
+    scheduler = core._get_scheduler()
+    if scheduler.get_job("cfg4py_refresh"):
+        scheduler.remove_job("cfg4py_refresh")
+
+
+class TestRedisConfigFetcher(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+
+        self.server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeStrictRedis(server=self.server)
+        patcher = mock.patch("redis.StrictRedis", fakeredis.FakeStrictRedis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # forget remote settings and refreshes left by other tests
+        remove_jobs()
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff.reset()
+
+    def tearDown(self):
+        if core._remote_fetcher is not None:
+            core._remote_fetcher.unwatch()
+            core._remote_fetcher = None
+
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+
+        remove_jobs()
+
+    def set_remote(self, host: str):
+        conf = {"services": {"redis2": {"host": host}}}
+        self.redis.set("my_app_config", json.dumps(conf))
+
+    def test_keyspace_notification(self):
+        self.redis.config_set("notify-keyspace-events", "K$")
+        self.set_remote("192.168.3.2")
+
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        fetcher = cfg4py.RedisConfigFetcher(
+            "my_app_config", subscribe=True, server=self.server
+        )
+        cfg4py.config_remote_fetcher(fetcher, interval=3600)
+
+        # the first fetch doesn't wait for the interval
+        self.assertTrue(wait_until(lambda: core._cfg_remote_hash is not None))
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+        self.assertEqual("127.0.0.1", cfg.services.redis.host)
+
+        self.set_remote("192.168.3.3")
+        self.assertTrue(wait_until(lambda: cfg.services.redis2.host == "192.168.3.3"))
+
+    def test_channel(self):
+        self.set_remote("192.168.3.2")
+
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        fetcher = cfg4py.RedisConfigFetcher(
+            "my_app_config", subscribe=True, channel="config", server=self.server
+        )
+        cfg4py.config_remote_fetcher(fetcher, interval=3600)
+        self.assertTrue(wait_until(lambda: core._cfg_remote_hash is not None))
+
+        # no notification, no refetch
+        self.set_remote("192.168.3.3")
+        time.sleep(0.5)
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+
+        self.redis.publish("config", "changed")
+        self.assertTrue(wait_until(lambda: cfg.services.redis2.host == "192.168.3.3"))
+
+    def test_polling(self):
+        self.set_remote("192.168.3.2")
+        fetcher = cfg4py.RedisConfigFetcher("my_app_config", server=self.server)
+
+        self.assertFalse(fetcher.watch(lambda: None))
+        self.assertEqual(
+            {"services": {"redis2": {"host": "192.168.3.2"}}}, fetcher.fetch()
+        )
+
+    def test_version(self):
+        fetcher = cfg4py.RedisConfigFetcher("my_app_config", server=self.server)
+        self.assertIsNone(fetcher.version())
+
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        core._remote_fetcher = fetcher
+        fetcher.publish('{"services": {"redis2": {"host": "192.168.3.2"}}}')
+        version = fetcher.version()
+        self.assertIsNotNone(version)
+
+        core._refresh()
+        self.assertEqual("192.168.3.2", cfg.services.redis2.host)
+
+        # version not moved, fetch is skipped
+        with mock.patch.object(fetcher, "fetch") as fetch:
+            core._refresh()
+            fetch.assert_not_called()
+
+        fetcher.publish('{"services": {"redis2": {"host": "192.168.3.3"}}}')
+        self.assertNotEqual(version, fetcher.version())
+        core._refresh()
+        self.assertEqual("192.168.3.3", cfg.services.redis2.host)
+
+    def test_publish_notifies(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        fetcher = cfg4py.RedisConfigFetcher(
+            "my_app_config", subscribe=True, channel="config", server=self.server
+        )
+        cfg4py.config_remote_fetcher(fetcher, interval=3600)
+
+        fetcher.publish('{"services": {"redis2": {"host": "192.168.3.4"}}}')
+        self.assertTrue(
+            wait_until(
+                lambda: getattr(cfg.services, "redis2", None) is not None
+                and cfg.services.redis2.host == "192.168.3.4"
+            )
+        )
+
+
+class TestRedisHashConfigFetcher(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+
+        self.server = fakeredis.FakeServer()
+        patcher = mock.patch("redis.StrictRedis", fakeredis.FakeStrictRedis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+
+    def tearDown(self):
+        core._remote_fetcher = None
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff.reset()
+
+    def test_changed_sections_only(self):
+        fetcher = cfg4py.RedisHashConfigFetcher(
+            "my_app_config", content_type="application/json", server=self.server
+        )
+        fetcher.publish(
+            {
+                "services": '{"redis2": {"host": "192.168.3.2"}}',
+                "tz": '"Asia/Shanghai"',
+            }
+        )
+        self.assertEqual(
+            {"services": {"redis2": {"host": "192.168.3.2"}}, "tz": "Asia/Shanghai"},
+            fetcher.fetch(),
+        )
+
+        fetcher.publish({"tz": '"UTC"'})
+        with mock.patch.object(
+            core, "_load_and_replace_envar", wraps=core._load_and_replace_envar
+        ) as load:
+            conf = fetcher.fetch()
+            load.assert_called_once_with('"UTC"', loader=fetcher.loader)
+
+        self.assertEqual("UTC", conf["tz"])
+        self.assertEqual({"redis2": {"host": "192.168.3.2"}}, conf["services"])
+
+        fetcher.publish(removed=["tz"])
+        with mock.patch.object(core, "_load_and_replace_envar") as load:
+            self.assertEqual(["services"], list(fetcher.fetch()))
+            load.assert_not_called()
+
+    def test_refresh(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        fetcher = cfg4py.RedisHashConfigFetcher(
+            "my_app_config", content_type="application/msgpack", server=self.server
+        )
+        core._remote_fetcher = fetcher
+
+        import msgpack
+
+        fetcher.publish({"services": msgpack.packb({"redis2": {"host": "h1"}})})
+        version = fetcher.version()
+        core._refresh()
+        self.assertEqual("h1", cfg.services.redis2.host)
+        # local settings override remote ones
+        self.assertEqual("127.0.0.1", cfg.services.redis.host)
+
+        fetcher.publish({"services": msgpack.packb({"redis2": {"host": "h2"}})})
+        self.assertNotEqual(version, fetcher.version())
+        core._refresh()
+        self.assertEqual("h2", cfg.services.redis2.host)
@@ -0,0 +1,116 @@
+"""Tests for scheduling of remote refreshes."""
+import os
+import random
+import threading
+import time
+import unittest
+from unittest import mock
+
+import cfg4py
+from cfg4py import core
+from cfg4py.backoff import Backoff
+from cfg4py.schedule import RefreshSchedule
+
+
+class TestRefreshSchedule(unittest.TestCase):
+    def test_jitter(self):
+        schedule = RefreshSchedule(60, jitter=0.2, rand=random.Random(78))
+        firsts = [schedule.first_delay() for _ in range(100)]
+        self.assertTrue(all(0 <= d <= 60 for d in firsts))
+        # spread over the interval, rather than at the same moment
+        self.assertGreater(max(firsts) - min(firsts), 30)
+
+        delays = [schedule.next_delay(False) for _ in range(100)]
+        self.assertTrue(all(48 <= d <= 72 for d in delays))
+        self.assertEqual(0, schedule.notify_delay())
+
+        with self.assertRaises(ValueError):
+            RefreshSchedule(60, jitter=1)
+
+    def test_adaptive(self):
+        schedule = RefreshSchedule(10, jitter=0, max_interval=60)
+        delays = [schedule.next_delay(False) for _ in range(4)]
+        self.assertEqual([20, 40, 60, 60], delays)
+
+        # tightened after a change
+        self.assertEqual(10, schedule.next_delay(True))
+        self.assertEqual(20, schedule.next_delay(False))
+
+
+class SlowFetcher(cfg4py.RemoteConfigFetcher):
+    def __init__(self):
+        self.fetched = 0
+        self.host = "h0"
+
+    def fetch(self) -> dict:
+        self.fetched += 1
+        time.sleep(0.2)
+        return {"services": {"redis2": {"host": self.host}}}
+
+
+class TestScheduling(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        core._backoff = Backoff()
+
+    def tearDown(self):
+        scheduler = core._get_scheduler()
+        if scheduler.get_job("cfg4py_refresh"):
+            scheduler.remove_job("cfg4py_refresh")
+
+        core._remote_fetcher, core._schedule = None, None
+        core._cfg_remote, core._cfg_remote_hash = {}, None
+        core._cfg_remote_version = None
+        if core._local_observer is not None:
+            core._local_observer.stop()
+            core._local_observer = None
+
+    def test_coalesce(self):
+        cfg4py.init(self.resource_path, dump_on_change=False)
+        fetcher = SlowFetcher()
+        core._remote_fetcher = fetcher
+
+        threads = [threading.Thread(target=core._refresh) for _ in range(8)]
+        for t in threads:
+            t.start()
+            time.sleep(0.01)
+        for t in threads:
+            t.join()
+
+        # one running, and one more for all the requests made meanwhile
+        self.assertEqual(2, fetcher.fetched)
+
+    def test_polling(self):
+        cfg = cfg4py.init(self.resource_path, dump_on_change=False)
+        fetcher = SlowFetcher()
+        fetcher.host = "h1"
+        cfg4py.config_remote_fetcher(fetcher, interval=0.1, max_interval=1)
+        end = time.time() + 5
+        while time.time() < end:
+            if getattr(cfg.services, "redis2", None) is not None:
+                break
+            time.sleep(0.05)
+
+        self.assertEqual("h1", cfg.services.redis2.host)
+        job = core._get_scheduler().get_job("cfg4py_refresh")
+        self.assertIsNotNone(job)
+
+    def test_restored(self):
+        cfg4py.init(self.resource_path, dump_on_change=False)
+        # as if restored from cache_dir
+        core._cfg_remote = {"services": {"redis2": {"host": "h0"}}}
+        fetcher = SlowFetcher()
+        with mock.patch.object(RefreshSchedule, "first_delay", return_value=30):
+            cfg4py.config_remote_fetcher(fetcher, interval=60)
+
+        # reconciled by the first poll, instead of a fetch at once
+        job = core._get_scheduler().get_job("cfg4py_refresh")
+        self.assertEqual({"first": False}, job.kwargs)
+        self.assertGreater(job.next_run_time.timestamp(), time.time() + 20)
+        time.sleep(0.1)
+        self.assertEqual(0, fetcher.fetched)
@@ -0,0 +1,110 @@
+"""Tests for configuration shared between processes."""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import cfg4py
+from cfg4py import core
+from cfg4py.shared import SharedSnapshot
+
+HOME = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+@unittest.skipIf(sys.platform == "win32", "POSIX only")
+class TestSharedSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "shared")
+
+    def tearDown(self):
+        core._close_shared()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_read_write(self):
+        writer = SharedSnapshot(self.path)
+        reader = SharedSnapshot(self.path)
+        try:
+            self.assertTrue(writer.acquire())
+            self.assertFalse(reader.acquire())
+            self.assertIsNone(reader.read())
+            self.assertEqual(0, reader.version())
+
+            writer.write({"a": 1})
+            self.assertEqual(1, reader.version())
+            self.assertEqual({"a": 1}, reader.read())
+            # not changed since last read
+            self.assertIsNone(reader.read())
+            # readers can't change what others read
+            with self.assertRaises(TypeError):
+                reader._mm[0:1] = b"x"
+
+            # the file grows
+            big = {"a": "x" * 100000}
+            writer.write(big)
+            self.assertEqual(2, reader.version())
+            self.assertEqual(big, reader.read())
+
+            # the lock is released on close
+            writer.close()
+            self.assertTrue(reader.acquire())
+            reader.write({"a": 2})
+            self.assertEqual(3, reader.version())
+        finally:
+            writer.close()
+            reader.close()
+
+    def test_supervisor_and_worker(self):
+        config_dir = os.path.join(self.root, "config")
+        os.makedirs(config_dir)
+        with open(os.path.join(config_dir, "defaults.yaml"), "w") as f:
+            f.write("account: aaron\n")
+
+        os.environ[cfg4py.envar] = "TEST"
+        cfg = cfg4py.init(config_dir, dump_on_change=False, shared=self.path)
+        self.assertTrue(core._shared.is_writer)
+        self.assertEqual("aaron", cfg.account)
+
+        worker = textwrap.dedent(
+            f"""
+            import sys, time
+            import cfg4py
+            from cfg4py import core
+
+            cfg = cfg4py.init(
+                {config_dir!r}, dump_on_change=False, shared={self.path!r},
+                shared_interval=0.05
+            )
+            # workers neither parse nor watch config files
+            assert core._local_observer is None and core._cfg_local == {{}}
+            print(cfg.account, flush=True)
+
+            sys.stdin.readline()
+            end = time.time() + 10
+            while cfg.account == "aaron" and time.time() < end:
+                time.sleep(0.05)
+            print(cfg.account, flush=True)
+            """
+        )
+        env = dict(os.environ, PYTHONPATH=HOME)
+        proc = subprocess.Popen(
+            [sys.executable, "-c", worker],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        try:
+            self.assertEqual("aaron", proc.stdout.readline().strip())
+
+            cfg4py.update_config({"account": "yang"})
+            proc.stdin.write("\n")
+            proc.stdin.flush()
+            self.assertEqual("yang", proc.stdout.readline().strip())
+        finally:
+            proc.kill()
+            proc.wait()
+            core._local_observer.stop()
@@ -0,0 +1,105 @@
+"""Tests for snapshot mode."""
+import os
+import threading
+import unittest
+
+import cfg4py
+from cfg4py import core
+from cfg4py.snapshot import ConfigHandle, FrozenConfig, LazyFrozenConfig, freeze
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        os.environ[cfg4py.envar] = "TEST"
+        self.resource_path = os.path.normpath(
+            os.path.join(os.path.dirname(__file__), "../cfg4py/resources/")
+        )
+
+    def tearDown(self):
+        core._snapshot_mode = False
+        core._lazy = False
+
+    def test_freeze(self):
+        conf = {"a": {"b": [1, 2]}, "logging": {"version": 1}}
+        root = freeze(conf, raw_keys=("logging",))
+
+        self.assertIsInstance(root.a, FrozenConfig)
+        self.assertEqual({"version": 1}, root.logging)
+        with self.assertRaises(AttributeError):
+            root.a.b = 1
+
+        # the tree doesn't share mutable leaves with its source
+        conf["a"]["b"].append(3)
+        self.assertEqual([1, 2], root.a.b)
+
+    def test_init(self):
+        cfg = cfg4py.init(self.resource_path, snapshot=True)
+        self.assertIsInstance(cfg, ConfigHandle)
+        self.assertIs(cfg, cfg4py.get_instance())
+        self.assertEqual("127.0.0.1", cfg.services.redis.host)
+        self.assertTrue(cfg.logging.get("handlers"))
+
+        version = cfg4py.get_snapshot().version
+        cfg4py.update_config({"services": {"redis": {"port": 6379}}})
+
+        # the handle follows the new snapshot, removed keys are gone
+        self.assertEqual(version + 1, cfg4py.get_snapshot().version)
+        self.assertEqual(6379, cfg.services.redis.port)
+        self.assertIsNone(getattr(cfg.services.redis, "host", None))
+        self.assertIsNone(getattr(cfg, "tz", None))
+
+        with self.assertRaises(AttributeError):
+            cfg.tz = "UTC"
+
+    def test_lazy(self):
+        cfg = cfg4py.init(
+            self.resource_path, dump_on_change=False, snapshot=True, lazy=True
+        )
+        root = cfg4py.get_snapshot().config
+        self.assertIsInstance(root, LazyFrozenConfig)
+        self.assertNotIn("services", root.__dict__)
+
+        services = cfg.services
+        self.assertEqual("127.0.0.1", services.redis.host)
+        self.assertIsInstance(services, LazyFrozenConfig)
+        with self.assertRaises(AttributeError):
+            services.redis.host = "localhost"
+
+        # nodes of unchanged sections are shared by the next snapshot
+        conf = cfg4py.get_snapshot().data
+        cfg4py.update_config({**conf, "tz": "UTC"})
+        self.assertIs(services, cfg.services)
+        self.assertEqual("UTC", cfg.tz)
+
+        cfg4py.update_config({**conf, "services": {"redis": {"host": "localhost"}}})
+        self.assertEqual("localhost", cfg.services.redis.host)
+        self.assertEqual("127.0.0.1", services.redis.host)
+
+        # mutable leaves are copied
+        cfg4py.update_config({"hosts": ["a"]})
+        hosts = cfg.hosts
+        hosts.append("b")
+        self.assertEqual(["a"], cfg4py.get_snapshot().data["hosts"])
+
+    def test_consistent_reads(self):
+        cfg4py.init(self.resource_path, dump_on_change=False, snapshot=True)
+
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                i += 1
+                cfg4py.update_config({"pair": {"a": i, "b": i}})
+
+        t = threading.Thread(target=writer)
+        t.start()
+        try:
+            for _ in range(10000):
+                snap = cfg4py.get_snapshot()
+                pair = getattr(snap.config, "pair", None)
+                if pair is not None:
+                    self.assertEqual(pair.a, pair.b)
+        finally:
+            stop.set()
+            t.join()